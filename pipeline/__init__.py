@@ -1,3 +1,23 @@
-from .run import run_benchmark
-from .evaluator import Evaluator
-from .validate import validate_suite
+"""Jac DocBench pipeline.
+
+Public names are resolved lazily so that importing a submodule (for example
+``python -m pipeline.validate``) does not load the HTTP/LLM stack.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "run_benchmark": ".run",
+    "Evaluator": ".evaluator",
+    "validate_suite": ".validate",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,150 @@
+"""Sequential early stopping: running score estimate with a confidence interval.
+
+Tests are drawn without replacement in a random stratified order, so the
+running score is a ratio estimate (sum of scores / sum of max scores) over a
+sample of the suite. Its interval uses the linearized ratio variance with a
+finite-population correction, which shrinks to zero once the whole suite has
+been spent.
+"""
+
+import math
+import random
+from statistics import NormalDist
+from typing import Dict, List, Optional, Tuple, Union
+
+
+def stratified_order(suite: List[Dict], seed: int = 0) -> List[Dict]:
+    """Shuffle tests so every prefix is spread proportionally across category x level.
+
+    Within each stratum tests are shuffled and placed at evenly spaced,
+    jittered positions in [0, 1); sorting by position interleaves the strata.
+    """
+    rng = random.Random(seed)
+    strata: Dict[Tuple[str, int], List[Dict]] = {}
+    for test in suite:
+        strata.setdefault((test["category"], test["level"]), []).append(test)
+
+    keyed = []
+    for key in sorted(strata):
+        tests = strata[key]
+        rng.shuffle(tests)
+        for rank, test in enumerate(tests):
+            keyed.append(((rank + rng.random()) / len(tests), test["id"], test))
+    keyed.sort(key=lambda item: (item[0], item[1]))
+    return [test for _, _, test in keyed]
+
+
+def ratio_interval(
+    scores: List[float], maxes: List[float], population: int, confidence: float = 0.95,
+) -> Tuple[float, float]:
+    """Ratio estimate sum(scores)/sum(maxes) and its CI half-width, both in percent."""
+    n = len(scores)
+    total_max = sum(maxes)
+    if not n or not total_max:
+        return 0.0, math.inf
+    ratio = sum(scores) / total_max
+    if n < 2:
+        return ratio * 100, math.inf
+    mean_max = total_max / n
+    residual_var = sum((y - ratio * x) ** 2 for y, x in zip(scores, maxes)) / (n - 1)
+    fpc = max(0.0, 1 - n / population) if population else 1.0
+    se = math.sqrt(fpc * residual_var / n) / mean_max
+    z = NormalDist().inv_cdf(0.5 + confidence / 2)
+    return ratio * 100, z * se * 100
+
+
+class SequentialEstimator:
+    """Tracks evaluated results and decides when a run can stop early.
+
+    ``baseline`` is either a previous results dict (compared per test, paired
+    on the tests both runs share) or a plain percentage to beat.
+    """
+
+    def __init__(
+        self,
+        population: int,
+        target_width: float = 5.0,
+        confidence: float = 0.95,
+        min_tests: int = 20,
+        baseline: Optional[Union[Dict, float]] = None,
+    ):
+        self.population = population
+        self.target_width = target_width
+        self.confidence = confidence
+        self.min_tests = min_tests
+        self.scores: List[float] = []
+        self.maxes: List[float] = []
+        self.baseline_value: Optional[float] = None
+        self.baseline_scores: Dict[str, float] = {}
+        self.diffs: List[float] = []
+        self.diff_maxes: List[float] = []
+        if isinstance(baseline, dict):
+            self.baseline_scores = {r["test_id"]: r["score"] for r in baseline.get("results", [])}
+        elif baseline is not None:
+            self.baseline_value = float(baseline)
+
+    def add(self, result: Dict):
+        self.scores.append(result["score"])
+        self.maxes.append(result["max_score"])
+        if result["test_id"] in self.baseline_scores:
+            self.diffs.append(result["score"] - self.baseline_scores[result["test_id"]])
+            self.diff_maxes.append(result["max_score"])
+
+    @property
+    def tests_spent(self) -> int:
+        return len(self.scores)
+
+    def estimate(self) -> Dict:
+        """Current estimate, interval and stopping decision."""
+        pct, half = ratio_interval(self.scores, self.maxes, self.population, self.confidence)
+        estimate = {
+            "tests_spent": self.tests_spent,
+            "tests_total": self.population,
+            "estimate": round(pct, 2),
+            "ci_low": round(pct - half, 2) if math.isfinite(half) else None,
+            "ci_high": round(pct + half, 2) if math.isfinite(half) else None,
+            "ci_width": round(2 * half, 2) if math.isfinite(half) else None,
+            "confidence": self.confidence,
+        }
+
+        comparison = None
+        if self.baseline_scores and len(self.diffs) >= 2:
+            diff, diff_half = ratio_interval(
+                self.diffs, self.diff_maxes, len(self.baseline_scores), self.confidence
+            )
+            comparison = {
+                "paired_tests": len(self.diffs),
+                "difference": round(diff, 2),
+                "ci_low": round(diff - diff_half, 2),
+                "ci_high": round(diff + diff_half, 2),
+                "decision": _decide(diff - diff_half, diff + diff_half),
+            }
+        elif self.baseline_value is not None and math.isfinite(half):
+            comparison = {
+                "baseline": self.baseline_value,
+                "decision": _decide(pct - half - self.baseline_value, pct + half - self.baseline_value),
+            }
+        if comparison:
+            estimate["comparison"] = comparison
+
+        estimate["stop_reason"] = self._stop_reason(half, comparison)
+        return estimate
+
+    def _stop_reason(self, half: float, comparison: Optional[Dict]) -> Optional[str]:
+        if self.tests_spent >= self.population:
+            return "exhausted"
+        if self.tests_spent < self.min_tests:
+            return None
+        if comparison and comparison["decision"] != "undecided":
+            return "comparison_decided"
+        if 2 * half <= self.target_width:
+            return "target_width"
+        return None
+
+
+def _decide(low: float, high: float) -> str:
+    if low > 0:
+        return "better"
+    if high < 0:
+        return "worse"
+    return "undecided"
@@ -0,0 +1,161 @@
+"""Per-run token and cost budgets enforced batch by batch.
+
+Before each LLM request a batch reserves its estimated prompt tokens and up
+to ``max_tokens`` of output. The request goes out only if what has been
+spent, plus what in-flight batches have reserved, plus the reservation
+still fits every limit. When the remaining output allowance is below
+``max_tokens`` the request is sent with the smaller cap. When the
+reservation does not fit, the batch waits for in-flight batches to settle.
+Once nothing is in flight and it still does not fit, the budget is
+exhausted and every remaining batch is cancelled.
+
+Settling replaces a reservation with the provider's reported usage. Prompt
+estimates are scaled by the observed actual/estimated ratio. Until the
+first usage report arrives, batches sent together can overshoot a limit by
+the error of their estimates.
+
+Costs use prices in USD per million tokens.
+"""
+
+import threading
+from typing import Dict, Optional, Tuple
+
+# A batch granted less output than this per test would most likely be truncated.
+MIN_OUTPUT_TOKENS_PER_TEST = 200
+
+LIMIT_FIELDS = ("max_input_tokens", "max_output_tokens", "max_cost")
+
+
+class RunBudget:
+    def __init__(
+        self,
+        max_input_tokens: Optional[int] = None,
+        max_output_tokens: Optional[int] = None,
+        max_cost: Optional[float] = None,
+        input_price: Optional[float] = None,
+        output_price: Optional[float] = None,
+    ):
+        if max_cost is not None and (input_price is None or output_price is None):
+            raise ValueError("max_cost needs input and output prices (USD per million tokens) for the model")
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.max_cost = max_cost
+        self.input_price = input_price or 0.0
+        self.output_price = output_price or 0.0
+        self.exhausted = False
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.requests = 0
+        self.batches_cancelled = 0
+        self._reserved_input = 0
+        self._reserved_output = 0
+        self._inflight = 0
+        self._estimated_input = 0
+        self._reported_input = 0
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_dict(cls, budget: Optional[Dict], model: str) -> Optional["RunBudget"]:
+        """Build from {max_input_tokens, max_output_tokens, max_cost, input_price,
+        output_price, prices: {model: {input, output}}}; None if no limit is set."""
+        if not budget or all(budget.get(f) is None for f in LIMIT_FIELDS):
+            return None
+        prices = (budget.get("prices") or {}).get(model, {})
+        return cls(
+            max_input_tokens=budget.get("max_input_tokens"),
+            max_output_tokens=budget.get("max_output_tokens"),
+            max_cost=budget.get("max_cost"),
+            input_price=budget.get("input_price", prices.get("input")),
+            output_price=budget.get("output_price", prices.get("output")),
+        )
+
+    def cost(self, input_tokens: float, output_tokens: float) -> float:
+        return (input_tokens * self.input_price + output_tokens * self.output_price) / 1_000_000
+
+    def reserve(self, prompt_tokens: int, max_tokens: int, tests: int) -> Optional[Tuple[int, int]]:
+        """Reserve room for one request. Returns (input reserved, output cap) or None if exhausted."""
+        with self._cond:
+            input_tokens = self._calibrated(prompt_tokens)
+            floor = min(max_tokens, MIN_OUTPUT_TOKENS_PER_TEST * tests)
+            while True:
+                if self.exhausted:
+                    self.batches_cancelled += 1
+                    return None
+                output_cap = min(max_tokens, self._output_room(input_tokens))
+                if output_cap >= max_tokens or (output_cap >= floor and not self._inflight):
+                    break
+                if not self._inflight:
+                    self.exhausted = True
+                    self.batches_cancelled += 1
+                    self._cond.notify_all()
+                    return None
+                self._cond.wait()
+            self._reserved_input += input_tokens
+            self._reserved_output += output_cap
+            self._inflight += 1
+            return input_tokens, output_cap
+
+    def settle(
+        self,
+        reservation: Tuple[int, int],
+        prompt_tokens: int,
+        usage: Optional[Tuple[int, int]],
+        failed: bool = False,
+    ):
+        """Replace a reservation with the usage the provider reported.
+
+        If no usage was reported, the full reservation is charged, unless the
+        request ``failed`` before any content arrived: then only the prompt
+        estimate is.
+        """
+        input_reserved, output_reserved = reservation
+        with self._cond:
+            self._reserved_input -= input_reserved
+            self._reserved_output -= output_reserved
+            self._inflight -= 1
+            self.requests += 1
+            if usage:
+                self.input_tokens += usage[0]
+                self.output_tokens += usage[1]
+                self._estimated_input += prompt_tokens
+                self._reported_input += usage[0]
+            else:
+                self.input_tokens += input_reserved
+                if not failed:
+                    self.output_tokens += output_reserved
+            self._cond.notify_all()
+
+    def _calibrated(self, prompt_tokens: int) -> int:
+        if not self._estimated_input:
+            return prompt_tokens
+        return round(prompt_tokens * self._reported_input / self._estimated_input)
+
+    def _output_room(self, input_tokens: int) -> int:
+        """Output tokens still affordable after a request of ``input_tokens``."""
+        rooms = []
+        used_input = self.input_tokens + self._reserved_input + input_tokens
+        used_output = self.output_tokens + self._reserved_output
+        if self.max_input_tokens is not None and used_input > self.max_input_tokens:
+            return 0
+        if self.max_output_tokens is not None:
+            rooms.append(self.max_output_tokens - used_output)
+        if self.max_cost is not None:
+            left = self.max_cost - self.cost(used_input, used_output)
+            if left < 0:
+                return 0
+            rooms.append(int(left * 1_000_000 / self.output_price) if self.output_price else float("inf"))
+        return max(0, min(rooms)) if rooms else float("inf")
+
+    def summary(self) -> Dict:
+        with self._cond:
+            summary = {
+                "exhausted": self.exhausted,
+                "input_tokens": self.input_tokens,
+                "output_tokens": self.output_tokens,
+                "requests": self.requests,
+                "batches_cancelled": self.batches_cancelled,
+                "limits": {f: getattr(self, f) for f in LIMIT_FIELDS if getattr(self, f) is not None},
+            }
+            if self.input_price or self.output_price:
+                summary["cost"] = round(self.cost(self.input_tokens, self.output_tokens), 6)
+            return summary
@@ -0,0 +1,196 @@
+"""Process-wide pool of OpenRouter clients, one per API key.
+
+Each client owns a bounded httpx connection pool whose keep-alive
+connections are reused by every batch thread and every later run with the
+same key, so back-to-back runs skip TCP/TLS setup. HTTP/2 is used when the
+``h2`` package is installed. Clients idle for ``IDLE_TIMEOUT`` seconds are
+closed, and at most ``MAX_CLIENTS`` idle clients are kept.
+
+``OPENROUTER_BASE_URL`` points all clients at another server, e.g. a local
+stand-in for testing.
+
+httpx and the SDK are imported when the first client is created, so the
+server can import this module at startup without loading the HTTP stack.
+"""
+
+import importlib.util
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, Dict, Iterator, Optional
+
+from .scheduling import key_id
+
+if TYPE_CHECKING:
+    import httpx
+    from openrouter import OpenRouter
+
+logger = logging.getLogger(__name__)
+
+# Matches the batch thread pool in llm._run_batches.
+MAX_CONNECTIONS = 20
+KEEPALIVE_EXPIRY = 90.0
+IDLE_TIMEOUT = 600.0
+MAX_CLIENTS = 32
+# Seconds a key accepted by ``ClientPool.verify`` stays verified.
+VERIFIED_TTL = 600.0
+
+HTTP2 = importlib.util.find_spec("h2") is not None
+
+
+class _PooledClient:
+    """One key's SDK client over a shared httpx pool, counting requests and
+    the connections opened for them (through httpcore's ``trace`` extension)."""
+
+    def __init__(self, api_key: str, server_url: Optional[str]):
+        import httpx
+        from openrouter import OpenRouter
+
+        self.requests = 0
+        self.connections_opened = 0
+        self._lock = threading.Lock()
+        self.http = httpx.Client(
+            transport=httpx.HTTPTransport(
+                http2=HTTP2,
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_CONNECTIONS,
+                    keepalive_expiry=KEEPALIVE_EXPIRY,
+                ),
+            ),
+            follow_redirects=True,
+            event_hooks={"request": [self._on_request]},
+        )
+        self.sdk = OpenRouter(api_key=api_key, client=self.http, server_url=server_url)
+        self.active = 0
+        self.runs = 0
+        self.last_used = time.monotonic()
+
+    def _on_request(self, request: "httpx.Request"):
+        with self._lock:
+            self.requests += 1
+        request.extensions["trace"] = self._trace
+
+    def _trace(self, event: str, info: Dict):
+        if event == "connection.connect_tcp.complete":
+            with self._lock:
+                self.connections_opened += 1
+
+    def close(self):
+        self.http.close()
+
+
+class ClientPool:
+    def __init__(self, server_url: Optional[str] = None):
+        self.server_url = server_url or os.getenv("OPENROUTER_BASE_URL") or None
+        self._lock = threading.Lock()
+        self._clients: Dict[str, _PooledClient] = {}
+        self._closed_requests = 0
+        self._closed_connections = 0
+        self._verified: Dict[str, float] = {}
+
+    @contextmanager
+    def client(self, api_key: str) -> Iterator["OpenRouter"]:
+        """Borrow the shared client for ``api_key``; it is never evicted while borrowed."""
+        key = key_id(api_key)
+        with self._lock:
+            self._evict_locked()
+            pooled = self._clients.get(key)
+            if pooled is None:
+                pooled = _PooledClient(api_key, self.server_url)
+                self._clients[key] = pooled
+            pooled.active += 1
+            pooled.runs += 1
+        try:
+            yield pooled.sdk
+        finally:
+            with self._lock:
+                pooled.active -= 1
+                pooled.last_used = time.monotonic()
+
+    def verify(self, api_key: str) -> bool:
+        """Whether OpenRouter accepts ``api_key`` (401/403 mean no).
+
+        Accepted keys are remembered for ``VERIFIED_TTL`` seconds. Other
+        errors (network, 5xx) are raised: the key could not be checked.
+        """
+        key = key_id(api_key)
+        with self._lock:
+            verified_at = self._verified.get(key)
+            if verified_at is not None and time.monotonic() - verified_at < VERIFIED_TTL:
+                return True
+        from openrouter import errors
+
+        with self.client(api_key) as sdk:
+            try:
+                sdk.api_keys.get_current_key_metadata()
+            except errors.OpenRouterError as exc:
+                if exc.status_code in (401, 403):
+                    return False
+                raise
+        with self._lock:
+            self._verified[key] = time.monotonic()
+        return True
+
+    def _evict_locked(self):
+        now = time.monotonic()
+        idle = sorted(
+            (c.last_used, key) for key, c in self._clients.items() if c.active == 0
+        )
+        excess = len(self._clients) - MAX_CLIENTS
+        for i, (last_used, key) in enumerate(idle):
+            if now - last_used > IDLE_TIMEOUT or i < excess:
+                self._close_locked(key)
+
+    def _close_locked(self, key: str):
+        pooled = self._clients.pop(key)
+        self._closed_requests += pooled.requests
+        self._closed_connections += pooled.connections_opened
+        pooled.close()
+        logger.debug(f"Closed idle LLM client {key}")
+
+    def close(self):
+        with self._lock:
+            for key in list(self._clients):
+                self._close_locked(key)
+
+    def stats(self) -> Dict:
+        """Request and connection counts; reuse_rate is the share of requests that
+        went over an already-open connection."""
+        with self._lock:
+            self._evict_locked()
+            now = time.monotonic()
+            clients = [
+                {
+                    "key": key,
+                    "runs": c.runs,
+                    "active": c.active,
+                    "requests": c.requests,
+                    "connections_opened": c.connections_opened,
+                    "idle_seconds": round(now - c.last_used, 1),
+                }
+                for key, c in self._clients.items()
+            ]
+            requests = self._closed_requests + sum(c["requests"] for c in clients)
+            opened = self._closed_connections + sum(c["connections_opened"] for c in clients)
+        return {
+            "http2": HTTP2,
+            "requests": requests,
+            "connections_opened": opened,
+            "reuse_rate": round(1 - opened / requests, 4) if requests else 0.0,
+            "clients": clients,
+        }
+
+
+_pool: Optional[ClientPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_client_pool() -> ClientPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ClientPool()
+        return _pool
@@ -0,0 +1,129 @@
+"""Suite compilation: per-run artifacts built once per suite content.
+
+``compile_suite`` turns a suite into compact prompt fragments, token
+estimates and evaluation rules, and caches the result by suite content
+hash; response schemas are cached per batch composition. ``call_llm`` and
+``Evaluator`` consume these instead of re-deriving them on every run.
+"""
+
+import json
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+
+from .store import content_hash
+from .syntax import compile_element
+
+if TYPE_CHECKING:
+    from openrouter.components.responseformatjsonschema import ResponseFormatJSONSchema
+
+# Rough characters per token for prompt size estimates.
+CHARS_PER_TOKEN = 4
+
+PROMPT_FIELDS = {
+    "debug": ("broken_code", "error_hint"),
+    "complete": ("partial_code", "completion_hint"),
+    "refactor": ("python_code",),
+}
+
+CACHE_SIZE = 16
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def prompt_entry(test: Dict) -> Dict:
+    """The fields of a test the model gets to see."""
+    entry = {
+        "id": test["id"],
+        "level": test["level"],
+        "category": test["category"],
+        "task": test["task"],
+        "points": test["points"],
+        "type": test.get("type", "generate"),
+    }
+    fields = PROMPT_FIELDS.get(entry["type"], ())
+    if fields and fields[0] in test:
+        for field in fields:
+            if field in test:
+                entry[field] = test[field]
+    return entry
+
+
+class EvaluationRules:
+    """Pre-built checks for one test: element matchers plus scoring inputs."""
+
+    def __init__(self, test: Dict):
+        self.required: List[Tuple[str, Callable[[str], bool]]] = [
+            (element, compile_element(element)) for element in test["required_elements"]
+        ]
+        self.forbidden: List[str] = list(test.get("forbidden_elements", []))
+        self.functional = test.get("type") == "functional" and bool(test.get("test_harness"))
+
+
+class CompiledSuite:
+    def __init__(self, suite: List[Dict], suite_hash: str):
+        self.hash = suite_hash
+        self.fragments: Dict[str, str] = {}
+        self.tokens: Dict[str, int] = {}
+        self.rules: Dict[str, EvaluationRules] = {}
+        for test in suite:
+            fragment = json.dumps(prompt_entry(test), separators=(",", ":"), ensure_ascii=False)
+            self.fragments[test["id"]] = fragment
+            self.tokens[test["id"]] = estimate_tokens(fragment)
+            self.rules[test["id"]] = EvaluationRules(test)
+
+    def prompt_tests(self, test_ids: List[str]) -> str:
+        """The compact ``{"tests": [...]}`` block for one batch."""
+        return '{"tests":[' + ",".join(self.fragments[i] for i in test_ids) + "]}"
+
+    def prompt_tokens(self, test_ids: List[str]) -> int:
+        """Estimated tokens for one batch's test block (documentation excluded)."""
+        return sum(self.tokens[i] for i in test_ids) + 3
+
+    def schema(self, test_ids: List[str]) -> "ResponseFormatJSONSchema":
+        return response_schema(tuple(test_ids))
+
+
+@lru_cache(maxsize=256)
+def response_schema(test_ids: Tuple[str, ...]) -> "ResponseFormatJSONSchema":
+    """Structured-output schema for one batch composition."""
+    from openrouter.components.responseformatjsonschema import (
+        JSONSchemaConfig,
+        ResponseFormatJSONSchema,
+    )
+
+    return ResponseFormatJSONSchema(
+        type="json_schema",
+        json_schema=JSONSchemaConfig(
+            name="benchmark_responses",
+            strict=True,
+            schema={
+                "type": "object",
+                "properties": {test_id: {"type": "string"} for test_id in test_ids},
+                "required": list(test_ids),
+                "additionalProperties": False,
+            },
+        ),
+    )
+
+
+_cache: "OrderedDict[str, CompiledSuite]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def compile_suite(suite: List[Dict], suite_hash: Optional[str] = None) -> CompiledSuite:
+    """Compiled artifacts for ``suite``, reused across runs with the same content."""
+    suite_hash = suite_hash or content_hash(suite)
+    with _cache_lock:
+        if suite_hash in _cache:
+            _cache.move_to_end(suite_hash)
+            return _cache[suite_hash]
+    compiled = CompiledSuite(suite, suite_hash)
+    with _cache_lock:
+        _cache[suite_hash] = compiled
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
@@ -0,0 +1,258 @@
+"""Evaluation job queue shared between the server and remote evaluation workers.
+
+Workers (``python -m pipeline.worker``) register, lease (code, test_case)
+jobs, run ``Evaluator.evaluate_single`` and post results back. A worker that
+stops heartbeating has its leased jobs put back at the front of the queue.
+Jobs are leased in weighted fair order across tenants, and highest
+priority (expected duration) first within a tenant. While no worker is
+alive, jobs are evaluated in a local thread pool with the same ordering,
+so a server without workers behaves exactly as before.
+"""
+
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Deque, Dict, List, Optional
+
+from .evaluator import Evaluator
+from .profiling import follow
+from .scheduling import FairQueue, PriorityExecutor, smoothed_mean, queue_status
+
+logger = logging.getLogger(__name__)
+
+
+def _cost(priority: float) -> float:
+    # Fair shares are in expected evaluation seconds; keep zero-priority jobs from being free.
+    return max(priority, 0.1)
+
+
+class _Job:
+    __slots__ = (
+        "job_id", "code", "test_case", "timeouts", "priority", "tenant",
+        "future", "worker", "leased_at", "attempts",
+    )
+
+    def __init__(
+        self, job_id: str, code: str, test_case: Dict, future: Future,
+        timeouts: Optional[Dict[str, float]] = None, priority: float = 0.0, tenant: str = "",
+    ):
+        self.job_id = job_id
+        self.code = code
+        self.test_case = test_case
+        self.timeouts = timeouts
+        self.priority = priority
+        self.tenant = tenant
+        self.future = future
+        self.worker: Optional[str] = None
+        self.leased_at = 0.0
+        self.attempts = 0
+
+
+class EvaluationCoordinator:
+    """Thread-safe queue of evaluation jobs with worker leases and reassignment."""
+
+    def __init__(
+        self,
+        worker_timeout: float = 30.0,
+        lease_timeout: float = 180.0,
+        local_workers: Optional[int] = None,
+        weights: Optional[Dict[str, float]] = None,
+    ):
+        self.worker_timeout = worker_timeout
+        self.lease_timeout = lease_timeout
+        self._cond = threading.Condition()
+        # Job ids in fair order; requeued jobs go ahead of everything.
+        self._queue = FairQueue(weights)
+        self._requeued: Deque[str] = deque()
+        self._hold: Optional[float] = None
+        self._jobs: Dict[str, _Job] = {}
+        self._workers: Dict[str, Dict] = {}
+        self._ids = itertools.count(1)
+        self._evaluator = Evaluator()
+        self._local = PriorityExecutor(local_workers or os.cpu_count() or 4, weights)
+        self._reaper: Optional[threading.Thread] = None
+
+    # -- producer side -------------------------------------------------------
+
+    def submit(
+        self, code: str, test_case: Dict, timeouts: Optional[Dict[str, float]] = None, priority: float = 0.0,
+        tenant: str = "",
+    ) -> Future:
+        """Queue one evaluation. The returned future resolves to the result row.
+
+        Tenants share workers fairly by weight; within ``tenant``, higher
+        ``priority`` (expected seconds, also the job's cost) is evaluated
+        first. ``timeouts`` are passed on to ``Evaluator.evaluate_single``.
+        """
+        future: Future = Future()
+        with self._cond:
+            self._reap_locked()
+            if not self._workers:
+                job = _Job("local", code, test_case, future, timeouts, priority, tenant)
+                self._submit_local(job)
+                return future
+            job = _Job(f"job-{next(self._ids)}", code, test_case, future, timeouts, priority, tenant)
+            self._jobs[job.job_id] = job
+            self._queue.push(tenant, priority, job.job_id, _cost(priority))
+            self._cond.notify_all()
+        self._ensure_reaper()
+        return future
+
+    # -- worker side ---------------------------------------------------------
+
+    def register(self, worker_id: str, info: Optional[Dict] = None):
+        with self._cond:
+            entry = self._workers.setdefault(worker_id, {"completed": 0, "failed": 0, "registered_at": time.time()})
+            entry.update(info or {})
+            entry["last_seen"] = time.time()
+        logger.info(f"Evaluation worker registered: {worker_id}")
+        self._ensure_reaper()
+
+    def heartbeat(self, worker_id: str) -> bool:
+        """Returns False if the worker is unknown (e.g. reaped) and must re-register."""
+        with self._cond:
+            entry = self._workers.get(worker_id)
+            if entry is None:
+                return False
+            entry["last_seen"] = time.time()
+            return True
+
+    def lease(self, worker_id: str, max_jobs: int = 1, wait: float = 20.0) -> Optional[List[Dict]]:
+        """Long-poll for up to max_jobs jobs. Returns None if the worker is not registered."""
+        deadline = time.time() + wait
+        with self._cond:
+            while True:
+                entry = self._workers.get(worker_id)
+                if entry is None:
+                    return None
+                entry["last_seen"] = time.time()
+                leased = []
+                while (self._requeued or self._queue) and len(leased) < max_jobs:
+                    job_id = self._requeued.popleft() if self._requeued else self._queue.pop()
+                    job = self._jobs.get(job_id)
+                    if job is None:
+                        continue
+                    if job.attempts == 0 and not job.future.set_running_or_notify_cancel():
+                        del self._jobs[job.job_id]
+                        continue
+                    job.worker = worker_id
+                    job.leased_at = time.time()
+                    job.attempts += 1
+                    leased.append({
+                        "job_id": job.job_id, "code": job.code,
+                        "test_case": job.test_case, "timeouts": job.timeouts,
+                    })
+                remaining = deadline - time.time()
+                if leased or remaining <= 0:
+                    return leased
+                self._cond.wait(min(remaining, 5.0))
+
+    def complete(self, worker_id: str, job_id: str, result: Optional[Dict] = None, error: Optional[str] = None) -> bool:
+        """Record a job result. Returns False for stale leases (job was reassigned)."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            entry = self._workers.get(worker_id)
+            if entry is not None:
+                entry["last_seen"] = time.time()
+            if job is None or job.worker != worker_id:
+                return False
+            del self._jobs[job_id]
+            self._hold = smoothed_mean(self._hold, time.time() - job.leased_at)
+            if entry is not None:
+                entry["failed" if error else "completed"] += 1
+        if error:
+            job.future.set_exception(RuntimeError(f"Worker {worker_id}: {error}"))
+        else:
+            job.future.set_result(result)
+        return True
+
+    def status(self) -> Dict:
+        with self._cond:
+            self._reap_locked()
+            now = time.time()
+            leased: Dict[str, int] = {}
+            for job in self._jobs.values():
+                if job.worker:
+                    leased[job.worker] = leased.get(job.worker, 0) + 1
+            return {
+                "queued": len(self._queue) + len(self._requeued),
+                "queued_by_tenant": self._queue.waiting(),
+                "leased": sum(leased.values()),
+                "workers": [
+                    {
+                        "worker_id": wid, **info,
+                        "idle_seconds": round(now - info["last_seen"], 1),
+                        "leased": leased.get(wid, 0),
+                    }
+                    for wid, info in sorted(self._workers.items())
+                ],
+            }
+
+    def queue_status(self, tenant: str) -> Optional[Dict]:
+        """Queue position and ETA of ``tenant``'s next evaluation; None if it has none queued."""
+        with self._cond:
+            if not self._workers:
+                return self._local.status(tenant)
+            capacity = sum(int(w.get("concurrency", 1)) for w in self._workers.values())
+            return queue_status(self._queue, tenant, capacity, self._hold)
+
+    def set_weights(self, weights: Dict[str, float]):
+        with self._cond:
+            self._queue.weights = dict(weights)
+        self._local.set_weights(weights)
+
+    # -- internals -----------------------------------------------------------
+
+    def _submit_local(self, job: _Job):
+        self._local.submit(job.priority, follow(self._run_local), job, tenant=job.tenant, cost=_cost(job.priority))
+
+    def _run_local(self, job: _Job):
+        if job.attempts == 0 and not job.future.set_running_or_notify_cancel():
+            return
+        try:
+            job.future.set_result(
+                self._evaluator.evaluate_single(job.code, job.test_case, timeouts=job.timeouts)
+            )
+        except Exception as exc:
+            job.future.set_exception(exc)
+
+    def _ensure_reaper(self):
+        with self._cond:
+            if self._reaper is None or not self._reaper.is_alive():
+                self._reaper = threading.Thread(target=self._reap_loop, daemon=True)
+                self._reaper.start()
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(min(5.0, self.worker_timeout / 2))
+            with self._cond:
+                self._reap_locked()
+
+    def _reap_locked(self):
+        """Drop dead workers, requeue their leases and expired leases; go local if none remain."""
+        now = time.time()
+        dead = [wid for wid, info in self._workers.items() if now - info["last_seen"] > self.worker_timeout]
+        for wid in dead:
+            logger.warning(f"Evaluation worker {wid} timed out; reassigning its jobs")
+            del self._workers[wid]
+
+        requeue = [
+            job for job in self._jobs.values()
+            if job.worker and (job.worker in dead or now - job.leased_at > self.lease_timeout)
+        ]
+        for job in requeue:
+            job.worker = None
+            self._requeued.append(job.job_id)
+
+        if not self._workers and (self._requeued or self._queue):
+            while self._requeued or self._queue:
+                job_id = self._requeued.popleft() if self._requeued else self._queue.pop()
+                job = self._jobs.pop(job_id, None)
+                if job is not None:
+                    self._submit_local(job)
+        elif requeue:
+            self._cond.notify_all()
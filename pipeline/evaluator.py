@@ -3,15 +3,20 @@
 import os
 import subprocess
 import tempfile
-from typing import Dict, List, Any, Tuple
+import time
+from typing import Dict, List, Any, Optional, Tuple
 
-from .syntax import validate_element, patch_missing_braces
+from .compiled import EvaluationRules, compile_suite
+from .syntax import patch_missing_braces
+
+# Fields a result row keeps once its code and checks have been streamed out.
+COMPACT_FIELDS = ("test_id", "category", "level", "score", "max_score", "percentage", "jac_valid")
 
 
 class Evaluator:
     """Evaluates Jac code: jac check + required/forbidden element matching."""
 
-    def jac_check(self, code: str) -> Tuple[bool, List[str], List[str]]:
+    def jac_check(self, code: str, timeout: float = 10) -> Tuple[bool, List[str], List[str]]:
         """Run jac check. Returns (is_valid, errors, warnings)."""
         with tempfile.NamedTemporaryFile(mode='w', suffix='.jac', delete=False) as f:
             f.write(code)
@@ -20,7 +25,7 @@ class Evaluator:
         try:
             result = subprocess.run(
                 ['jac', 'check', temp_path],
-                capture_output=True, text=True, timeout=10
+                capture_output=True, text=True, timeout=timeout
             )
             errors, warnings = [], []
             for line in (result.stdout + result.stderr).split('\n'):
@@ -42,29 +47,46 @@ class Evaluator:
             except OSError:
                 pass
 
-    def evaluate_single(self, code: str, test_case: Dict) -> Dict:
-        """Evaluate one test response. Non-compiling code scores 0."""
+    def evaluate_single(
+        self,
+        code: str,
+        test_case: Dict,
+        rules: Optional[EvaluationRules] = None,
+        timeouts: Optional[Dict[str, float]] = None,
+    ) -> Dict:
+        """Evaluate one test response. Non-compiling code scores 0.
+
+        ``rules`` are the test's precompiled checks (see ``compile_suite``);
+        they are built from ``test_case`` when not given. ``timeouts`` maps
+        "check"/"functional" to seconds (see ``TimingHistory.timeouts``).
+        The row's ``durations`` holds the seconds each completed phase took;
+        ``timed_out`` maps phases that hit their timeout to that timeout.
+        """
+        rules = rules or EvaluationRules(test_case)
+        timeouts = timeouts or {}
+        durations: Dict[str, float] = {}
+        timed_out: Dict[str, float] = {}
         patched_code, _ = patch_missing_braces(code)
         max_score = test_case["points"]
         passed_checks, failed_checks = [], []
         penalties = {"required": 0.0, "forbidden": 0.0, "jac_check": 0.0, "functional": 0.0}
 
         required_found = 0
-        for element in test_case["required_elements"]:
-            if validate_element(patched_code, element):
+        for element, matches in rules.required:
+            if matches(patched_code):
                 required_found += 1
                 passed_checks.append(f"[PASS] Found: '{element}'")
             else:
                 failed_checks.append(f"[FAIL] Missing: '{element}'")
 
         forbidden_found = 0
-        for element in test_case.get("forbidden_elements", []):
+        for element in rules.forbidden:
             if element in patched_code:
                 forbidden_found += 1
                 failed_checks.append(f"[FAIL] Contains forbidden: '{element}'")
 
-        total_required = len(test_case["required_elements"])
-        total_forbidden = len(test_case.get("forbidden_elements", []))
+        total_required = len(rules.required)
+        total_forbidden = len(rules.forbidden)
 
         required_score = (required_found / total_required * max_score) if total_required > 0 else max_score
         penalties["required"] = max_score - required_score
@@ -74,7 +96,14 @@ class Evaluator:
 
         score = max(0, required_score - forbidden_penalty)
 
-        jac_valid, jac_errors, jac_warnings = self.jac_check(patched_code)
+        check_timeout = timeouts.get("check", 10)
+        started = time.monotonic()
+        jac_valid, jac_errors, jac_warnings = self.jac_check(patched_code, check_timeout)
+        elapsed = time.monotonic() - started
+        if elapsed < check_timeout:
+            durations["check"] = round(elapsed, 3)
+        else:
+            timed_out["check"] = check_timeout
         if not jac_valid:
             penalties["jac_check"] = score
             score = 0
@@ -82,9 +111,16 @@ class Evaluator:
         else:
             passed_checks.append("[PASS] jac check passed")
 
-        if test_case.get("type") == "functional" and test_case.get("test_harness"):
+        if rules.functional:
             if jac_valid:
-                func_ok = self._run_functional_test(patched_code, test_case["test_harness"])
+                functional_timeout = timeouts.get("functional", 30)
+                started = time.monotonic()
+                func_ok = self._run_functional_test(patched_code, test_case["test_harness"], functional_timeout)
+                elapsed = time.monotonic() - started
+                if elapsed < functional_timeout:
+                    durations["functional"] = round(elapsed, 3)
+                else:
+                    timed_out["functional"] = functional_timeout
                 if func_ok:
                     passed_checks.append("[PASS] Functional tests passed")
                 else:
@@ -112,16 +148,18 @@ class Evaluator:
             "jac_errors": jac_errors,
             "jac_warnings": jac_warnings,
             "code": patched_code,
+            "durations": durations,
+            "timed_out": timed_out,
         }
 
-    def _run_functional_test(self, code: str, harness: str) -> bool:
+    def _run_functional_test(self, code: str, harness: str, timeout: float = 30) -> bool:
         with tempfile.NamedTemporaryFile(mode='w', suffix='.jac', delete=False) as f:
             f.write(code + "\n\n" + harness)
             temp_path = f.name
         try:
             result = subprocess.run(
                 ['jac', 'test', temp_path],
-                capture_output=True, text=True, timeout=30
+                capture_output=True, text=True, timeout=timeout
             )
             return result.returncode == 0
         except Exception:
@@ -132,32 +170,43 @@ class Evaluator:
             except OSError:
                 pass
 
+    def missing_result(self, test_case: Dict) -> Dict:
+        """Result row for a test that got no response."""
+        return {
+            "test_id": test_case["id"], "category": test_case["category"],
+            "level": test_case["level"], "score": 0,
+            "max_score": test_case["points"], "percentage": 0,
+            "score_breakdown": {"required": test_case["points"], "forbidden": 0, "jac_check": 0, "functional": 0},
+            "required_found": "0/0", "forbidden_found": 0,
+            "passed_checks": [], "failed_checks": ["[FAIL] No response"],
+            "jac_valid": False, "jac_errors": ["No code"], "jac_warnings": [],
+            "code": "",
+        }
+
+    def compact_result(self, result: Dict) -> Dict:
+        """Scoring fields of a result row, without code, checks or diagnostics."""
+        row = {k: result[k] for k in COMPACT_FIELDS}
+        row["responded"] = bool(result["code"])
+        return row
+
     def evaluate_all(self, responses: Dict[str, str], suite: List[Dict]) -> Dict[str, Any]:
         """Evaluate all responses against a suite. Returns full results JSON."""
+        compiled = compile_suite(suite)
         results = []
-        category_scores: Dict[str, Dict] = {}
-        level_scores: Dict[int, Dict] = {}
-
-        suite_by_id = {t["id"]: t for t in suite}
-
         for test_case in suite:
-            test_id = test_case["id"]
-            code = responses.get(test_id, "")
+            code = responses.get(test_case["id"], "")
             if code:
-                result = self.evaluate_single(code, test_case)
+                results.append(self.evaluate_single(code, test_case, compiled.rules[test_case["id"]]))
             else:
-                result = {
-                    "test_id": test_id, "category": test_case["category"],
-                    "level": test_case["level"], "score": 0,
-                    "max_score": test_case["points"], "percentage": 0,
-                    "score_breakdown": {"required": test_case["points"], "forbidden": 0, "jac_check": 0, "functional": 0},
-                    "required_found": "0/0", "forbidden_found": 0,
-                    "passed_checks": [], "failed_checks": ["[FAIL] No response"],
-                    "jac_valid": False, "jac_errors": ["No code"], "jac_warnings": [],
-                    "code": "",
-                }
-            results.append(result)
+                results.append(self.missing_result(test_case))
+        return self.summarize(results)
+
+    def summarize(self, results: List[Dict]) -> Dict[str, Any]:
+        """Aggregate per-test result rows (in suite order) into the full results JSON."""
+        category_scores: Dict[str, Dict] = {}
+        level_scores: Dict[int, Dict] = {}
 
+        for result in results:
             cat = result["category"]
             if cat not in category_scores:
                 category_scores[cat] = {"score": 0, "max": 0, "count": 0}
@@ -181,8 +230,8 @@ class Evaluator:
             "max_score": total_max,
             "percentage": round(total_score / total_max * 100, 2) if total_max else 0,
             "jac_check_pass_rate": round(jac_passed / len(results) * 100, 2) if results else 0,
-            "tests_total": len(suite),
-            "tests_responded": sum(1 for r in results if r["code"]),
+            "tests_total": len(results),
+            "tests_responded": sum(1 for r in results if r.get("responded", bool(r.get("code")))),
             "category_breakdown": {
                 cat: {
                     "score": round(s["score"], 2),
@@ -0,0 +1,99 @@
+"""Incremental parser for streamed {"test_id": "code", ...} JSON objects."""
+
+import json
+import re
+from typing import List, Tuple
+
+_STRING_RUN = re.compile(r'[^"\\]+')
+_WHITESPACE = " \t\r\n"
+
+(
+    _START,
+    _KEY_OR_END,
+    _KEY,
+    _COLON,
+    _VALUE,
+    _STRING_VALUE,
+    _COMMA_OR_END,
+    _DONE,
+) = range(8)
+
+
+class ObjectStreamParser:
+    """Feed text chunks of a flat JSON object with string values; get (key, value) pairs.
+
+    Each pair is returned by ``feed`` as soon as its value string closes.
+    Anything outside that shape (nested values, numbers, trailing garbage)
+    sets ``failed`` and stops emitting; callers then fall back to parsing
+    the full text with ``json.loads``.
+    """
+
+    def __init__(self):
+        self.state = _START
+        self.failed = False
+        self._raw: List[str] = []
+        self._escape = False
+        self._key = ""
+
+    def feed(self, text: str) -> List[Tuple[str, str]]:
+        pairs: List[Tuple[str, str]] = []
+        i, n = 0, len(text)
+        while i < n and not self.failed:
+            if self.state in (_KEY, _STRING_VALUE):
+                i = self._consume_string(text, i, pairs)
+                continue
+            ch = text[i]
+            i += 1
+            if ch in _WHITESPACE:
+                continue
+            if self.state == _START and ch == "{":
+                self.state = _KEY_OR_END
+            elif self.state == _KEY_OR_END and ch == '"':
+                self.state = _KEY
+            elif self.state == _KEY_OR_END and ch == "}":
+                self.state = _DONE
+            elif self.state == _COLON and ch == ":":
+                self.state = _VALUE
+            elif self.state == _VALUE and ch == '"':
+                self.state = _STRING_VALUE
+            elif self.state == _COMMA_OR_END and ch == ",":
+                self.state = _KEY_OR_END
+            elif self.state == _COMMA_OR_END and ch == "}":
+                self.state = _DONE
+            else:
+                self.failed = True
+        return pairs
+
+    def _consume_string(self, text: str, i: int, pairs: List[Tuple[str, str]]) -> int:
+        n = len(text)
+        while i < n:
+            if self._escape:
+                self._raw.append(text[i])
+                self._escape = False
+                i += 1
+                continue
+            match = _STRING_RUN.match(text, i)
+            if match:
+                self._raw.append(match.group())
+                i = match.end()
+                continue
+            ch = text[i]
+            i += 1
+            if ch == "\\":
+                self._raw.append(ch)
+                self._escape = True
+                continue
+            try:
+                value = json.loads('"' + "".join(self._raw) + '"')
+            except ValueError:
+                self.failed = True
+                return n
+            self._raw = []
+            if self.state == _KEY:
+                self._key = value
+                self.state = _COLON
+            else:
+                pairs.append((self._key, value))
+                self.state = _COMMA_OR_END
+            return i
+        return i
@@ -2,15 +2,19 @@
 
 import json
 import logging
+import threading
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from typing import Callable, Dict, List, Optional
+from contextlib import nullcontext
+from typing import TYPE_CHECKING, Callable, ContextManager, Dict, List, Optional, Set, Tuple, Union
 
-from openrouter import OpenRouter
-from openrouter.components.responseformatjsonschema import (
-    JSONSchemaConfig,
-    ResponseFormatJSONSchema,
-)
+from .budget import RunBudget
+from .compiled import CompiledSuite, compile_suite, estimate_tokens
+from .jsonstream import ObjectStreamParser
+from .profiling import follow
+
+if TYPE_CHECKING:
+    from openrouter import OpenRouter
 
 logger = logging.getLogger(__name__)
 
@@ -33,87 +37,133 @@ Return a JSON object mapping each test ID to Jac code. Use \\n for newlines and
 """
 
 
-def _build_response_schema(tests: List[Dict]) -> ResponseFormatJSONSchema:
-    properties = {t["id"]: {"type": "string"} for t in tests}
-    return ResponseFormatJSONSchema(
-        type="json_schema",
-        json_schema=JSONSchemaConfig(
-            name="benchmark_responses",
-            strict=True,
-            schema={
-                "type": "object",
-                "properties": properties,
-                "required": [t["id"] for t in tests],
-                "additionalProperties": False,
-            },
-        ),
-    )
-
-
-def _format_tests_for_prompt(tests: List[Dict]) -> str:
-    formatted = []
-    for test in tests:
-        entry = {
-            "id": test["id"],
-            "level": test["level"],
-            "category": test["category"],
-            "task": test["task"],
-            "points": test["points"],
-            "type": test.get("type", "generate"),
-        }
-        test_type = entry["type"]
-        if test_type == "debug" and "broken_code" in test:
-            entry["broken_code"] = test["broken_code"]
-            if "error_hint" in test:
-                entry["error_hint"] = test["error_hint"]
-        elif test_type == "complete" and "partial_code" in test:
-            entry["partial_code"] = test["partial_code"]
-            if "completion_hint" in test:
-                entry["completion_hint"] = test["completion_hint"]
-        elif test_type == "refactor" and "python_code" in test:
-            entry["python_code"] = test["python_code"]
-        formatted.append(entry)
-    return json.dumps({"tests": formatted}, indent=2)
-
-
 def _run_single_batch(
-    client: OpenRouter,
+    client: "OpenRouter",
     model: str,
     doc_content: str,
     batch: List[Dict],
     temperature: float,
     max_tokens: int,
     batch_num: int,
+    on_response: Optional[Callable[[str, str], None]] = None,
+    seed: Optional[int] = None,
+    compiled: Optional[CompiledSuite] = None,
+    budget: Optional[RunBudget] = None,
+    slot: Optional[Callable[[], ContextManager]] = None,
+    cancel: Optional[threading.Event] = None,
 ) -> tuple:
-    """Run one batch with retries. Returns (batch_num, responses_dict, error)."""
+    """Run one batch with retries. Returns (batch_num, responses, error).
+
+    ``responses`` is the {test_id: code} dict. With ``on_response`` the
+    completion is streamed and each test's code is handed over as soon as
+    its JSON string closes, at most once even across retries; no code is
+    kept, and ``responses`` is the set of test ids handed over. With ``budget`` every attempt first reserves its
+    tokens and the batch is cancelled once the budget is exhausted. With
+    ``slot`` every request is sent while holding the context it returns.
+    Once ``cancel`` is set no further attempt is made and a streaming
+    request is abandoned.
+    """
+    compiled = compiled or compile_suite(batch)
+    test_ids = [t["id"] for t in batch]
     prompt = PROMPT_TEMPLATE.format(
         doc_content=doc_content,
-        test_prompts_json=_format_tests_for_prompt(batch),
+        test_prompts_json=compiled.prompt_tests(test_ids),
     )
-    schema = _build_response_schema(batch)
+    schema = compiled.schema(test_ids)
+    batch_ids = set(test_ids)
+    prompt_tokens = estimate_tokens(prompt)
+    emitted: Set[str] = set()
+
+    def emit(test_id: str, code: str):
+        if test_id in batch_ids and test_id not in emitted:
+            emitted.add(test_id)
+            on_response(test_id, code)
 
     max_retries = 3
     for attempt in range(max_retries):
+        reservation, meter = None, {"usage": None, "content": False}
         try:
             if attempt > 0:
                 time.sleep(2 ** attempt)
-            response = client.chat.send(
+            if cancel is not None and cancel.is_set():
+                return batch_num, set(emitted), "Cancelled"
+            if budget:
+                reservation = budget.reserve(prompt_tokens, max_tokens, len(batch))
+                if reservation is None:
+                    logger.warning(f"Batch {batch_num} cancelled: budget exhausted")
+                    return batch_num, set(emitted), "Budget exhausted"
+            request = dict(
                 model=model,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=temperature,
-                max_tokens=max_tokens,
+                max_tokens=reservation[1] if reservation else max_tokens,
                 response_format=schema,
                 http_referer="https://github.com/jaseci-llmdocs",
                 x_title="Jaseci DocBench",
             )
-            parsed = json.loads(response.choices[0].message.content.strip())
+            if seed is not None:
+                request["seed"] = seed
+            with slot() if slot else nullcontext():
+                if on_response:
+                    _stream_batch(client, request, emit, meter, cancel)
+                    parsed = set(emitted)
+                else:
+                    response = client.chat.send(**request)
+                    meter.update(usage=_usage(response), content=True)
+                    parsed = json.loads(response.choices[0].message.content.strip())
             logger.info(f"Batch {batch_num} completed ({len(parsed)} responses)")
             return batch_num, parsed, None
         except Exception as exc:
             if attempt >= max_retries - 1:
                 logger.error(f"Batch {batch_num} failed after {max_retries} attempts: {exc}")
-                return batch_num, {}, str(exc)
-    return batch_num, {}, "Unknown error"
+                return batch_num, set(emitted), str(exc)
+        finally:
+            if reservation:
+                budget.settle(reservation, prompt_tokens, meter["usage"], failed=not meter["content"])
+    return batch_num, set(emitted), "Unknown error"
+
+
+def _usage(response) -> Optional[Tuple[int, int]]:
+    """(prompt, completion) tokens reported with a response or final stream chunk."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    return int(usage.prompt_tokens), int(usage.completion_tokens)
+
+
+def _stream_batch(
+    client: "OpenRouter",
+    request: Dict,
+    emit: Callable[[str, str], None],
+    meter: Dict,
+    cancel: Optional[threading.Event] = None,
+) -> None:
+    """Stream one completion, emitting (test_id, code) pairs as they close.
+
+    ``meter`` gets the reported (prompt, completion)
+    token ``usage`` and whether any ``content`` arrived, also when the
+    stream breaks off or its JSON does not parse.
+    """
+    parser = ObjectStreamParser()
+    chunks: List[str] = []
+    with client.chat.send(**request, stream=True) as stream:
+        for chunk in stream:
+            if cancel is not None and cancel.is_set():
+                raise RuntimeError("Cancelled")
+            meter["usage"] = _usage(chunk) or meter["usage"]
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if not isinstance(text, str) or not text:
+                continue
+            meter["content"] = True
+            chunks.append(text)
+            for test_id, code in parser.feed(text):
+                emit(test_id, code)
+    parsed = json.loads("".join(chunks).strip())
+    for test_id, code in parsed.items():
+        if isinstance(code, str):
+            emit(test_id, code)
 
 
 def call_llm(
@@ -125,39 +175,141 @@ def call_llm(
     batch_size: int = 45,
     temperature: float = 0.1,
     on_batch_complete: Optional[Callable] = None,
-) -> Dict[str, str]:
-    """Send all tests to the LLM in batches and return {test_id: code} responses."""
-    client = OpenRouter(api_key=api_key)
+    on_response: Optional[Callable[[str, str], None]] = None,
+    compiled: Optional[CompiledSuite] = None,
+    budget: Optional[RunBudget] = None,
+    slot: Optional[Callable[[], ContextManager]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> Union[Dict[str, str], Set[str]]:
+    """Send all tests to the LLM in batches and return {test_id: code} responses.
+
+    ``on_response(test_id, code)`` switches to streaming completions and is
+    called from worker threads as each test's code arrives; the code is not
+    kept, and the set of test ids that got a response is returned instead.
+    ``compiled`` supplies prompt fragments and schemas (compiled from
+    ``suite`` if omitted).
+    ``budget`` limits the tokens and cost spent; batches that no longer fit
+    are cancelled and reported as failed. ``slot()`` returns a context held
+    around each request, e.g. a server-wide fair concurrency slot. Setting
+    ``cancel`` stops sending requests, e.g. when nobody waits for the run.
+    """
+    callback = (lambda sample: on_response) if on_response else None
+    return _run_batches(
+        api_key, model, suite, doc_content, max_tokens, batch_size, temperature,
+        1, on_batch_complete, callback, compiled, budget, slot, cancel,
+    )[0]
+
+
+def call_llm_samples(
+    api_key: str,
+    model: str,
+    suite: List[Dict],
+    doc_content: str,
+    samples: int,
+    max_tokens: int = 16000,
+    batch_size: int = 45,
+    temperature: float = 0.1,
+    on_batch_complete: Optional[Callable] = None,
+    on_response: Optional[Callable[[str, int, str], None]] = None,
+    compiled: Optional[CompiledSuite] = None,
+    budget: Optional[RunBudget] = None,
+    slot: Optional[Callable[[], ContextManager]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> Dict[str, List[Union[str, bool]]]:
+    """Request ``samples`` independent completions per test. Returns {test_id: [code per sample]}.
+
+    The SDK has no ``n`` parameter, so each batch is sent ``samples`` times
+    in parallel with the identical prompt (the provider can serve the shared
+    documentation prefix from its prompt cache) and a distinct seed.
+    ``on_response(test_id, sample, code)``, ``budget``, ``slot`` and ``cancel``
+    work as in ``call_llm``; with ``on_response`` it returns {test_id: [responded per sample]}.
+    """
+    callback = (
+        (lambda sample: lambda test_id, code: on_response(test_id, sample, code)) if on_response else None
+    )
+
+    per_sample = _run_batches(
+        api_key, model, suite, doc_content, max_tokens, batch_size, temperature,
+        samples, on_batch_complete, callback, compiled, budget, slot, cancel,
+    )
+    if on_response:
+        return {t["id"]: [t["id"] in responded for responded in per_sample] for t in suite}
+    return {t["id"]: [responses.get(t["id"], "") for responses in per_sample] for t in suite}
+
+
+def _run_batches(
+    api_key: str,
+    model: str,
+    suite: List[Dict],
+    doc_content: str,
+    max_tokens: int,
+    batch_size: int,
+    temperature: float,
+    samples: int,
+    on_batch_complete: Optional[Callable],
+    on_response: Optional[Callable[[int], Callable[[str, str], None]]],
+    compiled: Optional[CompiledSuite] = None,
+    budget: Optional[RunBudget] = None,
+    slot: Optional[Callable[[], ContextManager]] = None,
+    cancel: Optional[threading.Event] = None,
+) -> List[Union[Dict[str, str], Set[str]]]:
+    """Run every batch ``samples`` times. Returns one {test_id: code} dict per sample,
+    or with ``on_response`` one set of responded test ids per sample."""
+    from .clients import get_client_pool
+
+    clients = get_client_pool()
+    compiled = compiled or compile_suite(suite)
 
     num_batches = (len(suite) + batch_size - 1) // batch_size
-    batches = []
-    for i in range(num_batches):
-        start = i * batch_size
-        batches.append((i + 1, suite[start : start + batch_size]))
+    jobs = []
+    for sample in range(samples):
+        for i in range(num_batches):
+            start = i * batch_size
+            jobs.append((len(jobs) + 1, sample, suite[start : start + batch_size]))
 
-    logger.info(f"Running {num_batches} batches ({len(suite)} tests, batch_size={batch_size})")
+    logger.info(
+        f"Running {len(jobs)} batches ({len(suite)} tests, batch_size={batch_size}, samples={samples}, "
+        f"~{compiled.prompt_tokens([t['id'] for t in suite]) // max(num_batches, 1)} test tokens per batch)"
+    )
 
-    responses: Dict[str, str] = {}
+    responses: List[Union[Dict[str, str], Set[str]]] = [set() if on_response else {} for _ in range(samples)]
     errors = []
 
-    with ThreadPoolExecutor(max_workers=min(20, num_batches)) as executor:
-        futures = [
+    with clients.client(api_key) as client, ThreadPoolExecutor(max_workers=min(20, len(jobs))) as executor:
+        futures = {
             executor.submit(
-                _run_single_batch, client, model, doc_content,
+                follow(_run_single_batch), client, model, doc_content,
                 batch, temperature, max_tokens, batch_num,
-            )
-            for batch_num, batch in batches
-        ]
+                on_response(sample) if on_response else None,
+                sample if samples > 1 else None,
+                compiled, budget, slot, cancel,
+            ): sample
+            for batch_num, sample, batch in jobs
+        }
         for future in as_completed(futures):
             batch_num, batch_responses, error = future.result()
             if error:
                 errors.append(f"Batch {batch_num}: {error}")
-            else:
-                responses.update(batch_responses)
+            responses[futures[future]].update(batch_responses)
             if on_batch_complete:
-                on_batch_complete(batch_num, num_batches, error)
+                on_batch_complete(batch_num, len(jobs), error)
+
+    stats = clients.stats()
+    logger.info(
+        f"LLM connections: {stats['connections_opened']} opened for {stats['requests']} requests "
+        f"since start ({stats['reuse_rate']:.0%} reused)"
+    )
+
+    if budget and budget.exhausted:
+        spent = budget.summary()
+        logger.warning(
+            f"Budget exhausted: {spent['batches_cancelled']} batch(es) cancelled after "
+            f"{spent['input_tokens']} input / {spent['output_tokens']} output tokens"
+        )
+        if not any(responses):
+            raise RuntimeError("Budget exhausted before any batch completed")
 
-    if not responses:
+    if not any(responses):
         raise RuntimeError(f"All batches failed: {'; '.join(errors)}")
 
     if errors:
@@ -0,0 +1,289 @@
+"""Columnar runs x tests score matrix for cross-run analytics.
+
+Each recorded run appends its per-test rows to flat binary column files
+(run index, test index, score, max_score, jac_valid) that are memory-mapped
+on read, so analytics over hundreds of runs never re-parse result JSON.
+``tests.json`` maps test indexes to id/category/level and ``runs.jsonl``
+holds one metadata line per run; a run is visible only once its metadata
+line (which records where its rows end) is written.
+
+    python -m pipeline.matrix import results/*.json
+    python -m pipeline.matrix summary
+"""
+
+import argparse
+import fcntl
+import json
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+
+RESULTS_DIR = Path(__file__).parent.parent / "results"
+
+COLUMNS = {
+    "run": np.int32,
+    "test": np.int32,
+    "score": np.float32,
+    "max_score": np.float32,
+    "jac_valid": np.uint8,
+}
+
+
+class ScoreMatrix:
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root) if root else RESULTS_DIR / "matrix"
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    # -- writes --------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with open(self.root / ".lock", "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def record(self, results: Dict, run_id: Optional[str] = None) -> int:
+        """Append one ``evaluate_all``-style result. Returns its run index."""
+        rows = results.get("results", [])
+        meta = results.get("meta", {})
+        with self._locked():
+            tests = self._load_tests()
+            index = {tid: i for i, tid in enumerate(tests["ids"])}
+            for r in rows:
+                if r["test_id"] not in index:
+                    index[r["test_id"]] = len(tests["ids"])
+                    tests["ids"].append(r["test_id"])
+                    tests["categories"].append(r["category"])
+                    tests["levels"].append(r["level"])
+
+            runs = self._load_runs()
+            run_idx = len(runs)
+            start = runs[-1]["end"] if runs else 0
+            columns = {
+                "run": np.full(len(rows), run_idx, dtype=COLUMNS["run"]),
+                "test": np.array([index[r["test_id"]] for r in rows], dtype=COLUMNS["test"]),
+                "score": np.array([r["score"] for r in rows], dtype=COLUMNS["score"]),
+                "max_score": np.array([r["max_score"] for r in rows], dtype=COLUMNS["max_score"]),
+                "jac_valid": np.array([bool(r.get("jac_valid")) for r in rows], dtype=COLUMNS["jac_valid"]),
+            }
+            for name, values in columns.items():
+                path = self.root / f"{name}.bin"
+                with open(path, "r+b" if path.exists() else "wb") as f:
+                    # Truncate rows left behind by an interrupted append before writing.
+                    f.truncate(start * values.itemsize)
+                    f.seek(start * values.itemsize)
+                    f.write(values.tobytes())
+
+            tmp = self.root / "tests.json.tmp"
+            tmp.write_text(json.dumps(tests))
+            tmp.replace(self.root / "tests.json")
+            entry = {
+                "run": run_idx,
+                "run_id": run_id or f"run-{run_idx}",
+                "recorded_at": time.time(),
+                "model": meta.get("model"),
+                "suite": meta.get("suite"),
+                "suite_version": meta.get("suite_version"),
+                "partial": bool(meta.get("partial")),
+                "selection": meta.get("selection"),
+                "end": start + len(rows),
+            }
+            with open(self.root / "runs.jsonl", "a") as f:
+                f.write(json.dumps(entry) + "\n")
+        return run_idx
+
+    # -- reads ---------------------------------------------------------------
+
+    def _load_tests(self) -> Dict[str, List]:
+        path = self.root / "tests.json"
+        if not path.exists():
+            return {"ids": [], "categories": [], "levels": []}
+        return json.loads(path.read_text())
+
+    def _load_runs(self) -> List[Dict]:
+        path = self.root / "runs.jsonl"
+        if not path.exists():
+            return []
+        runs = []
+        with open(path) as f:
+            for line in f:
+                if line.endswith("\n"):
+                    runs.append(json.loads(line))
+        return runs
+
+    def load(self) -> "MatrixView":
+        runs = self._load_runs()
+        tests = self._load_tests()
+        n = runs[-1]["end"] if runs else 0
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            path = self.root / f"{name}.bin"
+            if n and path.exists():
+                columns[name] = np.memmap(path, dtype=dtype, mode="r", shape=(n,))
+            else:
+                columns[name] = np.zeros(0, dtype=dtype)
+        return MatrixView(runs, tests, columns)
+
+
+class MatrixView:
+    """Dense runs x tests arrays built from the column files, plus vectorized aggregates.
+
+    The aggregates leave out partial runs (sub-suite, shard, exhausted budget
+    or adaptive early stop) unless ``include_partial`` is set, so a smoke
+    run over a few tests doesn't weigh as much as a full one.
+    """
+
+    def __init__(self, runs: List[Dict], tests: Dict[str, List], columns: Dict[str, np.ndarray]):
+        self.runs = runs
+        self.test_ids = np.array(tests["ids"], dtype=object)
+        categories = sorted(set(tests["categories"]))
+        self.categories = np.array(categories, dtype=object)
+        self.test_category = np.array(
+            [categories.index(c) for c in tests["categories"]], dtype=np.int32
+        )
+        self.test_level = np.array(tests["levels"], dtype=np.int32)
+
+        shape = (len(runs), len(self.test_ids))
+        self.present = np.zeros(shape, dtype=bool)
+        self.score = np.zeros(shape, dtype=np.float32)
+        self.max_score = np.zeros(shape, dtype=np.float32)
+        self.jac_valid = np.zeros(shape, dtype=bool)
+        r, t = columns["run"], columns["test"]
+        self.present[r, t] = True
+        self.score[r, t] = columns["score"]
+        self.max_score[r, t] = columns["max_score"]
+        self.jac_valid[r, t] = columns["jac_valid"].astype(bool)
+
+    def _run_mask(
+        self, model: Optional[str] = None, suite: Optional[str] = None, include_partial: bool = False,
+    ) -> np.ndarray:
+        mask = np.ones(len(self.runs), dtype=bool)
+        if not include_partial:
+            mask &= np.array([not (r.get("partial") or r.get("selection")) for r in self.runs], dtype=bool)
+        if model:
+            mask &= np.array([r["model"] == model for r in self.runs], dtype=bool)
+        if suite:
+            mask &= np.array([r["suite"] == suite for r in self.runs], dtype=bool)
+        return mask
+
+    def test_stats(
+        self, model: Optional[str] = None, suite: Optional[str] = None, include_partial: bool = False,
+    ) -> List[Dict]:
+        """Per-test pass rate (full marks), mean percentage and jac check rate across runs."""
+        mask = self._run_mask(model, suite, include_partial)
+        present = self.present[mask]
+        attempts = present.sum(axis=0)
+        passed = (present & (self.score[mask] >= self.max_score[mask])).sum(axis=0)
+        valid = (present & self.jac_valid[mask]).sum(axis=0)
+        score = np.where(present, self.score[mask], 0).sum(axis=0)
+        max_score = np.where(present, self.max_score[mask], 0).sum(axis=0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pass_rate = np.where(attempts > 0, passed / attempts * 100, 0)
+            jac_rate = np.where(attempts > 0, valid / attempts * 100, 0)
+            pct = np.where(max_score > 0, score / max_score * 100, 0)
+        return [
+            {
+                "test_id": self.test_ids[i],
+                "category": self.categories[self.test_category[i]],
+                "level": int(self.test_level[i]),
+                "runs": int(attempts[i]),
+                "pass_rate": round(float(pass_rate[i]), 2),
+                "mean_percentage": round(float(pct[i]), 2),
+                "jac_check_pass_rate": round(float(jac_rate[i]), 2),
+            }
+            for i in np.flatnonzero(attempts)
+        ]
+
+    def category_stats(
+        self, model: Optional[str] = None, suite: Optional[str] = None, include_partial: bool = False,
+    ) -> Dict[str, Dict]:
+        """Score/max per category summed over runs, and the per-run percentage trend."""
+        mask = self._run_mask(model, suite, include_partial)
+        n_cat = len(self.categories)
+        present = self.present[mask]
+        score = np.where(present, self.score[mask], 0)
+        max_score = np.where(present, self.max_score[mask], 0)
+        # runs x categories via one matrix product with the test->category one-hot.
+        onehot = np.zeros((len(self.test_ids), n_cat), dtype=np.float32)
+        onehot[np.arange(len(self.test_ids)), self.test_category] = 1
+        cat_score = score @ onehot
+        cat_max = max_score @ onehot
+        run_ids = [r["run_id"] for r, keep in zip(self.runs, mask) if keep]
+        out = {}
+        for c in range(n_cat):
+            total_max = float(cat_max[:, c].sum())
+            if not total_max:
+                continue
+            with np.errstate(divide="ignore", invalid="ignore"):
+                trend = np.where(cat_max[:, c] > 0, cat_score[:, c] / cat_max[:, c] * 100, np.nan)
+            out[self.categories[c]] = {
+                "score": round(float(cat_score[:, c].sum()), 2),
+                "max": total_max,
+                "percentage": round(float(cat_score[:, c].sum()) / total_max * 100, 2),
+                "trend": [
+                    {"run_id": rid, "percentage": round(float(p), 2)}
+                    for rid, p in zip(run_ids, trend) if not np.isnan(p)
+                ],
+            }
+        return out
+
+    def model_ranking(self, suite: Optional[str] = None, include_partial: bool = False) -> List[Dict]:
+        """Models ranked by overall percentage across all their runs."""
+        mask = self._run_mask(suite=suite, include_partial=include_partial)
+        models = np.array([r["model"] or "" for r in self.runs], dtype=object)
+        run_score = np.where(self.present, self.score, 0).sum(axis=1)
+        run_max = np.where(self.present, self.max_score, 0).sum(axis=1)
+        ranking = []
+        for name in sorted(set(models[mask])):
+            sel = mask & (models == name)
+            total_max = float(run_max[sel].sum())
+            ranking.append({
+                "model": name,
+                "runs": int(sel.sum()),
+                "percentage": round(float(run_score[sel].sum()) / total_max * 100, 2) if total_max else 0,
+            })
+        ranking.sort(key=lambda r: -r["percentage"])
+        return ranking
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Columnar score matrix across runs")
+    parser.add_argument("--root", help="Matrix directory (default: results/matrix)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Record result JSON files")
+    imp.add_argument("files", nargs="+")
+    summary = sub.add_parser("summary", help="Print model ranking and hardest tests")
+    summary.add_argument("--include-partial", action="store_true", help="Also count partial and sub-suite runs")
+    args = parser.parse_args()
+
+    matrix = ScoreMatrix(args.root)
+    if args.command == "import":
+        for path in args.files:
+            with open(path) as f:
+                results = json.load(f)
+            if "results" not in results:
+                print(f"Skipping {path}: not a result file", file=sys.stderr)
+                continue
+            run_idx = matrix.record(results, run_id=Path(path).stem)
+            print(f"{path}: run {run_idx}")
+    else:
+        view = matrix.load()
+        include_partial = args.include_partial
+        print(json.dumps({
+            "runs": len(view.runs),
+            "models": view.model_ranking(include_partial=include_partial),
+            "hardest_tests": sorted(
+                view.test_stats(include_partial=include_partial), key=lambda t: t["mean_percentage"],
+            )[:10],
+        }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
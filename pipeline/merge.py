@@ -0,0 +1,183 @@
+"""Merge the results of a run split across hosts with ``--shard i/N``.
+
+    python -m pipeline.run merge shard-1.json shard-2.json ... -o merged.json
+
+Each input is the JSON or JSONL output of one shard. The shards must come
+from the same run settings (model, suite version, documentation content,
+selection, generation parameters). Each shard must hold exactly the tests that
+``shard_tests`` assigns to it. Missing and duplicate shards are errors
+unless ``--allow-missing`` is given, in which case the missing tests count
+as unanswered and the result is flagged partial.
+
+The per-test rows are put back in suite order and summarized once, so the
+breakdowns and rates are identical to a single run of the whole selection.
+"""
+
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .evaluator import Evaluator
+from .sampling import sampling_summary
+from .subset import select_tests, shard_tests
+from .validate import get_store
+
+logger = logging.getLogger(__name__)
+
+# Meta fields every shard of one run must agree on.
+RUN_FIELDS = (
+    "model", "suite", "suite_version", "doc_url", "doc_sha256", "max_tokens",
+    "batch_size", "temperature", "selection", "samples",
+)
+
+
+def load_shard(path: Path) -> Dict:
+    """Read one shard's results: a results JSON, or the summary line of JSONL output."""
+    if path.suffix == ".jsonl":
+        summary = None
+        with open(path) as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    if record.get("type") in ("summary", "error"):
+                        summary = record
+        if summary is None:
+            raise ValueError("no summary line (the shard run did not finish)")
+        if summary["type"] == "error":
+            raise ValueError(f"shard run failed: {summary.get('error')}")
+        data = summary
+    else:
+        with open(path) as f:
+            data = json.load(f)
+        if not isinstance(data, dict) or "error" in data:
+            raise ValueError(f"shard run failed: {data.get('error') if isinstance(data, dict) else data}")
+    if "shard" not in data.get("meta", {}):
+        raise ValueError("not a shard result (no meta.shard)")
+    return data
+
+
+def merge_shards(sources: List[Path], allow_missing: bool = False) -> Dict:
+    """Combine shard results into the results JSON of the whole run.
+
+    Raises ValueError if the shards disagree on run settings, overlap,
+    hold tests not assigned to them, or (unless ``allow_missing``) leave
+    shards out.
+    """
+    if not sources:
+        raise ValueError("no shard results given")
+    shards: Dict[int, Tuple[Path, Dict]] = {}
+    first_meta: Optional[Dict] = None
+    for source in sources:
+        data = load_shard(source)
+        meta = data["meta"]
+        index, count = meta["shard"]["index"], meta["shard"]["count"]
+        if first_meta is None:
+            first_meta = meta
+        if count != first_meta["shard"]["count"]:
+            raise ValueError(f"{source}: shard {index}/{count} is from a split into {first_meta['shard']['count']}")
+        for field in RUN_FIELDS:
+            if meta.get(field) != first_meta.get(field):
+                raise ValueError(f"{source}: {field} {meta.get(field)!r} differs from {sources[0]} ({first_meta.get(field)!r})")
+        if index in shards:
+            raise ValueError(f"duplicate shard {index}/{count}: {shards[index][0]} and {source}")
+        shards[index] = (source, data)
+
+    count = first_meta["shard"]["count"]
+    missing = [i for i in range(1, count + 1) if i not in shards]
+    if missing and not allow_missing:
+        raise ValueError(f"missing shard(s) {', '.join(f'{i}/{count}' for i in missing)}")
+
+    suite = get_store().load(first_meta["suite"], first_meta["suite_version"])
+    suite_total = len(suite)
+    if first_meta.get("selection"):
+        suite = select_tests(suite, **first_meta["selection"])
+
+    evaluator = Evaluator()
+    rows: Dict[str, Dict] = {}
+    for index, (source, data) in sorted(shards.items()):
+        expected = {t["id"] for t in shard_tests(suite, index, count)}
+        got = [r["test_id"] for r in data["results"]]
+        if len(got) != len(set(got)) or set(got) != expected:
+            raise ValueError(
+                f"{source}: tests do not match shard {index}/{count} of "
+                f"{first_meta['suite']} v{first_meta['suite_version']}"
+            )
+        for row in data["results"]:
+            rows[row["test_id"]] = row
+    ordered = [rows.get(t["id"]) or evaluator.missing_result(t) for t in suite]
+
+    results = evaluator.summarize(ordered)
+    shard_metas = [data["meta"] for _, data in shards.values()]
+    meta = {k: v for k, v in first_meta.items() if k not in ("shard", "budget", "partial")}
+    meta["partial"] = (
+        len(suite) < suite_total
+        or bool(missing)
+        or any(m.get("budget", {}).get("exhausted") for m in shard_metas)
+    )
+    meta["shards"] = {
+        "count": count,
+        "merged": [str(shards[i][0]) for i in sorted(shards)],
+        "missing": missing,
+        "merged_at": time.time(),
+    }
+    budgets = [m["budget"] for m in shard_metas if "budget" in m]
+    if budgets:
+        meta["budget"] = {
+            "exhausted": any(b["exhausted"] for b in budgets),
+            "input_tokens": sum(b["input_tokens"] for b in budgets),
+            "output_tokens": sum(b["output_tokens"] for b in budgets),
+            "requests": sum(b["requests"] for b in budgets),
+            "batches_cancelled": sum(b["batches_cancelled"] for b in budgets),
+        }
+        if all("cost" in b for b in budgets):
+            meta["budget"]["cost"] = round(sum(b["cost"] for b in budgets), 6)
+    if first_meta.get("samples", 1) > 1:
+        shard_sampling = [data.get("sampling", {}) for _, data in shards.values()]
+        results["sampling"] = sampling_summary(
+            [r for r in ordered if "pass_at" in r], first_meta["samples"],
+            sum(s.get("evaluations", 0) for s in shard_sampling),
+            sum(s.get("deduplicated", 0) for s in shard_sampling),
+        )
+    results["meta"] = meta
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pipeline.run merge",
+        description="Merge the results of a run split with --shard i/N",
+    )
+    parser.add_argument("files", nargs="+", help="Shard result files (JSON or JSONL output)")
+    parser.add_argument("--output", "-o", help="Output file path (default: stdout)")
+    parser.add_argument("--allow-missing", action="store_true", help="Merge even if shards are missing (partial result)")
+    parser.add_argument("--record", action="store_true", help="Append the merged result to the score matrix (results/matrix)")
+    parser.add_argument("--verbose", "-v", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(levelname)s: %(message)s",
+    )
+
+    try:
+        results = merge_shards([Path(f) for f in args.files], args.allow_missing)
+    except (OSError, KeyError, ValueError) as exc:
+        parser.exit(1, f"merge failed: {exc}\n")
+    if results["meta"]["shards"]["missing"]:
+        logger.warning(f"Shards missing: {results['meta']['shards']['missing']}; result is partial")
+
+    if args.record:
+        from .matrix import ScoreMatrix
+
+        ScoreMatrix().record(results)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output)
+        logger.info(f"Merged {len(args.files)} shard(s) into {args.output}")
+    else:
+        print(output)
@@ -0,0 +1,313 @@
+"""On-demand run profiling: cProfile or sampled call stacks plus tracemalloc snapshots per stage.
+
+``RunProfiler.wrap`` drives a ``run_benchmark_streaming`` generator under
+the profiler and takes a memory snapshot at every stage boundary: setup,
+validation, doc fetch, LLM (with overlapped evaluation), evaluation, and
+serialization, which the caller starts with ``mark("serialization")``.
+``stop`` writes:
+
+- ``<name>.pstats``: cProfile stats of the run (open with ``snakeviz`` or
+  ``python -m pstats``); or, for a sampled profile, ``<name>.samples.txt``
+  (functions by sample count) and ``<name>.folded`` (collapsed stacks for
+  speedscope or flamegraph.pl)
+- ``<name>.memory.txt``: per-stage time, traced current/peak memory and the
+  top allocation growth by source line
+
+cProfile suits a process that runs nothing else, such as the CLI: from
+Python 3.12 one profiler sees every thread, and before that ``follow``
+gives each thread doing the run's work a profiler of its own. In a server
+cProfile would pick up every other run (and on 3.12+ only one can be
+active at a time), so the server samples instead: a thread reads
+``sys._current_frames`` every ``SAMPLE_INTERVAL`` seconds, looking only at
+threads doing the run's work, the one driving the generator and those
+handed work through ``follow``. Sampled times are wall-clock estimates
+that include waiting, and there are no call counts.
+
+tracemalloc is process-wide, so only one run can be profiled at a time and
+its memory figures include whatever else the process is doing.
+"""
+
+import cProfile
+import functools
+import logging
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Generator, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILES_DIR = Path(__file__).parent.parent / "results" / "profiles"
+SAMPLE_INTERVAL = 0.005
+TOP_ALLOCATIONS = 25
+TOP_FUNCTIONS = 60
+TRACEBACK_FRAMES = 10
+
+# From 3.12 cProfile hooks sys.monitoring, so one profiler covers all threads.
+PROFILES_ALL_THREADS = sys.version_info >= (3, 12)
+
+_active = threading.Lock()
+
+# Thread ident -> profiler of the run whose work the thread is doing.
+_owners: Dict[int, "RunProfiler"] = {}
+
+FunctionKey = Tuple[str, int, str]
+
+
+def follow(fn: Callable) -> Callable:
+    """Wrap ``fn`` so that wherever it runs, it is profiled with the calling thread's run.
+
+    Returns ``fn`` itself when the calling thread is not being profiled, or
+    when the run's profiler already sees every thread.
+    """
+    profiler = _owners.get(threading.get_ident())
+    if profiler is None or (not profiler.sampled and PROFILES_ALL_THREADS):
+        return fn
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        with profiler.attached():
+            return fn(*args, **kwargs)
+
+    return run
+
+
+class RunProfiler:
+    def __init__(self, name: str, directory: Optional[Path] = None, sampled: bool = False):
+        self.directory = Path(directory) if directory else PROFILES_DIR
+        self.sampled = sampled
+        self.pstats_path = self.directory / f"{name}.pstats"
+        self.samples_path = self.directory / f"{name}.samples.txt"
+        self.folded_path = self.directory / f"{name}.folded"
+        self.memory_path = self.directory / f"{name}.memory.txt"
+        self._profile: Optional[cProfile.Profile] = None
+        # Finished per-thread profiles (before 3.12), merged into the main one on stop.
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._profiled_threads: Set[int] = set()
+        self._lock = threading.Lock()
+        # Sampled call stacks, outermost frame first -> [samples, seconds].
+        self._stacks: Dict[Tuple[FunctionKey, ...], list] = {}
+        self._sampler: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._stages: List[Dict] = []
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._was_tracing = False
+        self._started = 0.0
+        self._running = False
+        self._stage = "setup"
+
+    def paths(self) -> Dict[str, str]:
+        if self.sampled:
+            return {"samples": str(self.samples_path), "folded": str(self.folded_path), "memory": str(self.memory_path)}
+        return {"pstats": str(self.pstats_path), "memory": str(self.memory_path)}
+
+    # -- lifecycle -----------------------------------------------------------
+
+    def start(self):
+        """Begin profiling. Raises RuntimeError if another run is being profiled."""
+        if not _active.acquire(blocking=False):
+            raise RuntimeError("Another profiled run is in progress")
+        self._running = True
+        self._was_tracing = tracemalloc.is_tracing()
+        if not self._was_tracing:
+            tracemalloc.start(TRACEBACK_FRAMES)
+        self._started = time.monotonic()
+        self._snapshot = self._take_snapshot()
+        if self.sampled:
+            self._stopping.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name="run-profiler", daemon=True)
+            self._sampler.start()
+        else:
+            self._profile = cProfile.Profile()
+            self._profiled_threads.add(threading.get_ident())
+            self._profile.enable()
+
+    def mark(self, stage: str):
+        """Start ``stage``, closing the current one with its time, memory and allocation growth."""
+        if not self._running:
+            return
+        snapshot = self._take_snapshot()
+        growth = snapshot.compare_to(self._snapshot, "lineno")[:TOP_ALLOCATIONS]
+        self._snapshot = snapshot
+        self._stages.append(self._stage_row(self._stage, growth))
+        self._stage = stage
+
+    def stop(self) -> Dict[str, str]:
+        """Stop profiling and write the reports. Returns their paths."""
+        if not self._running:
+            return self.paths()
+        self.mark("")
+        self._running = False
+        try:
+            if self.sampled:
+                self._stopping.set()
+                self._sampler.join()
+            else:
+                self._profile.disable()
+            for ident, owner in list(_owners.items()):
+                if owner is self:
+                    _owners.pop(ident, None)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if self.sampled:
+                if self._stacks:
+                    self.samples_path.write_text(self._samples_report())
+                    self.folded_path.write_text(self._folded())
+            else:
+                stats = pstats.Stats(self._profile)
+                with self._lock:
+                    for profile in self._thread_profiles:
+                        stats.add(profile)
+                stats.dump_stats(self.pstats_path)
+            self.memory_path.write_text(self._memory_report())
+        finally:
+            if not self._was_tracing:
+                tracemalloc.stop()
+            _active.release()
+        logger.info(f"Profile written to {', '.join(self.paths().values())}")
+        return self.paths()
+
+    @contextmanager
+    def attached(self):
+        """Profile the current thread as part of this run while the block runs."""
+        ident = threading.get_ident()
+        previous = _owners.get(ident)
+        profile = None
+        if self._running:
+            _owners[ident] = self
+            if not self.sampled and not PROFILES_ALL_THREADS:
+                with self._lock:
+                    if ident not in self._profiled_threads:
+                        self._profiled_threads.add(ident)
+                        profile = cProfile.Profile()
+        if profile:
+            profile.enable()
+        try:
+            yield
+        finally:
+            if profile:
+                profile.disable()
+                with self._lock:
+                    self._profiled_threads.discard(ident)
+                    self._thread_profiles.append(profile)
+            if previous is None:
+                _owners.pop(ident, None)
+            else:
+                _owners[ident] = previous
+
+    def wrap(self, events: Generator[Dict, None, None]) -> Generator[Dict, None, None]:
+        """Drive ``events`` under the profiler, marking a stage at every status event.
+
+        The profiler is started on the first ``next`` and stopped if the
+        generator is closed before its result; after the result, the caller
+        marks "serialization" and calls ``stop``.
+        """
+        if not self._running:
+            self.start()
+        finished = False
+        try:
+            while True:
+                with self.attached():
+                    event = next(events, None)
+                if event is None:
+                    return
+                if event["type"] == "status":
+                    self.mark(event["stage"])
+                finished = event["type"] in ("result", "error")
+                yield event
+        except GeneratorExit:
+            with self.attached():
+                events.close()
+            if not finished:
+                self.stop()
+            raise
+
+    # -- internals -----------------------------------------------------------
+
+    def _sample_loop(self):
+        last = time.perf_counter()
+        while not self._stopping.wait(SAMPLE_INTERVAL):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            frames = sys._current_frames()
+            for ident, owner in list(_owners.items()):
+                if owner is self and ident in frames:
+                    self._record(frames[ident], elapsed)
+
+    def _record(self, frame, elapsed: float):
+        stack: List[FunctionKey] = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        entry = self._stacks.setdefault(tuple(reversed(stack)), [0, 0.0])
+        entry[0] += 1
+        entry[1] += elapsed
+
+    def _samples_report(self) -> str:
+        # function -> [samples on top, samples anywhere, own seconds, cumulative seconds]
+        functions: Dict[FunctionKey, list] = {}
+        for stack, (count, seconds) in self._stacks.items():
+            for func in set(stack):
+                entry = functions.setdefault(func, [0, 0, 0.0, 0.0])
+                entry[1] += count
+                entry[3] += seconds
+            top = functions[stack[-1]]
+            top[0] += count
+            top[2] += seconds
+        total = sum(count for count, _ in self._stacks.values())
+        lines = [
+            f"{total} samples of the run's threads, taken every {SAMPLE_INTERVAL * 1000:g} ms.",
+            "Counts are samples, not calls; times are wall-clock estimates and include waiting.",
+            "",
+            f"{'own':>8}{'total':>8}{'own (s)':>10}{'total (s)':>11}  function",
+        ]
+        ranked = sorted(functions.items(), key=lambda item: item[1][1], reverse=True)
+        for (filename, lineno, name), (own, cumulative, own_s, cumulative_s) in ranked[:TOP_FUNCTIONS]:
+            lines.append(f"{own:>8}{cumulative:>8}{own_s:>10.3f}{cumulative_s:>11.3f}  {filename}:{lineno}({name})")
+        return "\n".join(lines) + "\n"
+
+    def _folded(self) -> str:
+        return "".join(
+            ";".join(f"{name} ({filename}:{lineno})" for filename, lineno, name in stack) + f" {count}\n"
+            for stack, (count, _) in self._stacks.items()
+        )
+
+    def _take_snapshot(self) -> tracemalloc.Snapshot:
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        ))
+
+    def _stage_row(self, stage: str, growth: List[tracemalloc.StatisticDiff]) -> Dict:
+        current, peak = tracemalloc.get_traced_memory()
+        return {
+            "stage": stage,
+            "at": time.monotonic() - self._started,
+            "current": current,
+            "peak": peak,
+            "growth": growth,
+        }
+
+    def _memory_report(self) -> str:
+        mb = 1024 * 1024
+        lines = [f"{'stage':<16}{'ended at (s)':>13}{'current (MB)':>14}{'peak (MB)':>12}"]
+        for row in self._stages:
+            lines.append(
+                f"{row['stage']:<16}{row['at']:>13.2f}{row['current'] / mb:>14.2f}{row['peak'] / mb:>12.2f}"
+            )
+        for row in self._stages:
+            if not row["growth"]:
+                continue
+            lines += ["", f"Top allocation growth during '{row['stage']}':"]
+            for diff in row["growth"]:
+                frame = diff.traceback[0]
+                lines.append(
+                    f"  {diff.size_diff / 1024:>+10.1f} KiB {diff.count_diff:>+8} blocks  "
+                    f"{frame.filename}:{frame.lineno}"
+                )
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,257 @@
+"""Evaluate-only mode: re-score archived responses without calling the LLM.
+
+    python -m pipeline.run evaluate responses/*.json archive/ -o rescored/
+
+Each input is a JSON object ``{test_id: code}``, a results JSON (its
+``results`` rows supply test_id/code and its ``meta`` is carried over), or
+JSONL whose lines are either ``{test_id: code}`` maps or records with
+``test_id`` and ``code``. Directories are searched for .json/.jsonl files,
+skipping earlier ``*.results.json`` outputs. With ``--output-dir`` the
+inputs' directory layout below their common parent is mirrored there.
+Tests from all files share one evaluation pool, each file's slowest tests
+(by duration history) are queued first, and each file's results are
+written as soon as its last test is scored.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .compiled import compile_suite
+from .evaluator import Evaluator
+from .scheduling import get_history
+from .validate import get_store
+
+logger = logging.getLogger(__name__)
+
+RESPONSE_SUFFIXES = {".json", ".jsonl"}
+RESULTS_SUFFIX = ".results.json"
+
+
+def expand_paths(paths: Iterable[str]) -> List[Path]:
+    """Input files, with directories expanded to the response files beneath them."""
+    files = []
+    for p in map(Path, paths):
+        if p.is_dir():
+            files.extend(sorted(
+                f for f in p.rglob("*")
+                if f.suffix in RESPONSE_SUFFIXES and not f.name.endswith(RESULTS_SUFFIX)
+            ))
+        else:
+            files.append(p)
+    return files
+
+
+def load_responses(path: Path) -> Tuple[Dict[str, str], Dict]:
+    """Read {test_id: code} and any run metadata from one response file."""
+    if path.suffix == ".jsonl":
+        responses: Dict[str, str] = {}
+        with open(path) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                if "test_id" in record:
+                    if record.get("code"):
+                        responses[record["test_id"]] = record["code"]
+                elif record.get("type") not in ("summary", "error"):
+                    responses.update({k: v for k, v in record.items() if isinstance(v, str)})
+        return responses, {}
+
+    with open(path) as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    if isinstance(data.get("results"), list):
+        return {r["test_id"]: r["code"] for r in data["results"] if r.get("code")}, data.get("meta", {})
+    return {k: v for k, v in data.items() if isinstance(v, str)}, {}
+
+
+def output_path(source: Path, output_dir: Optional[Path], root: Optional[Path] = None) -> Path:
+    """``<stem>.results.json`` next to ``source``, or in ``output_dir`` under
+    the path of ``source``'s directory relative to ``root``."""
+    name = f"{source.stem}{RESULTS_SUFFIX}"
+    if not output_dir:
+        return source.with_name(name)
+    parent = source.resolve().parent
+    return output_dir / (parent.relative_to(root) if root else Path()) / name
+
+
+def output_paths(paths: List[Path], output_dir: Optional[Path]) -> List[Path]:
+    """Output file for each input. Raises ValueError if two inputs would share one."""
+    root = Path(os.path.commonpath([p.resolve().parent for p in paths])) if output_dir and paths else None
+    targets = [output_path(p, output_dir, root) for p in paths]
+    seen: Dict[Path, Path] = {}
+    for source, target in zip(paths, targets):
+        if target in seen:
+            raise ValueError(f"{seen[target]} and {source} would both be written to {target}")
+        seen[target] = source
+    return targets
+
+
+class _FileJob:
+    def __init__(self, source: Path, target: Path, suite: List[Dict], meta: Dict):
+        self.source = source
+        self.target = target
+        self.meta = meta
+        self.rows: List[Optional[Dict]] = [None] * len(suite)
+        self.remaining = 0
+        self.lock = threading.Lock()
+
+
+def rescore_files(
+    paths: List[Path],
+    suite_name: str,
+    suite_version: Optional[int] = None,
+    output_dir: Optional[Path] = None,
+    jobs: int = os.cpu_count() or 4,
+) -> List[Dict]:
+    """Evaluate every response file against one suite snapshot. Returns a summary per file.
+
+    Raises ValueError if two inputs map to the same output file.
+    """
+    targets = output_paths(paths, output_dir)
+    store = get_store()
+    if suite_version is None:
+        suite_version = store.current_version(suite_name)
+    suite = store.load(suite_name, suite_version)
+    compiled = compile_suite(suite)
+    suite_ids = {t["id"] for t in suite}
+    evaluator = Evaluator()
+    history = get_history()
+
+    summaries: List[Dict] = []
+    summaries_lock = threading.Lock()
+    # Bound queued evaluations so response files are read only as fast as they are scored.
+    slots = threading.BoundedSemaphore(jobs * 4)
+
+    def finish(job: _FileJob):
+        try:
+            write_results(job)
+        except Exception as exc:
+            logger.error(f"{job.source}: could not write results: {exc}")
+            with summaries_lock:
+                summaries.append({"source": str(job.source), "error": str(exc)})
+
+    def write_results(job: _FileJob):
+        results = evaluator.summarize(job.rows)
+        results["meta"] = {
+            **job.meta,
+            "suite": suite_name,
+            "suite_version": suite_version,
+            "rescored_from": str(job.source),
+            "rescored_at": time.time(),
+        }
+        job.target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = job.target.with_name(job.target.name + ".tmp")
+        tmp.write_text(json.dumps(results, indent=2))
+        tmp.replace(job.target)
+        summary = {
+            "source": str(job.source),
+            "output": str(job.target),
+            "percentage": results["percentage"],
+            "tests_responded": results["tests_responded"],
+        }
+        logger.info(f"{job.source}: {results['percentage']}% -> {job.target}")
+        with summaries_lock:
+            summaries.append(summary)
+
+    def on_evaluated(job: _FileJob, index: int, future):
+        slots.release()
+        test_case = suite[index]
+        try:
+            row = future.result()
+            history.record(test_case["id"], row.get("durations"), row.get("timed_out"))
+        except Exception as exc:
+            logger.error(f"{job.source}: evaluation of {test_case['id']} failed: {exc}")
+            row = evaluator.missing_result(test_case)
+            row["failed_checks"] = [f"[FAIL] Evaluation error: {exc}"]
+        with job.lock:
+            job.rows[index] = row
+            job.remaining -= 1
+            last = job.remaining == 0
+        if last:
+            finish(job)
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for source, target in zip(paths, targets):
+            try:
+                responses, meta = load_responses(source)
+            except (OSError, ValueError, KeyError) as exc:
+                logger.error(f"{source}: unreadable response file: {exc}")
+                with summaries_lock:
+                    summaries.append({"source": str(source), "error": str(exc)})
+                continue
+            unknown = set(responses) - suite_ids
+            if unknown:
+                logger.warning(f"{source}: {len(unknown)} responses for tests not in {suite_name}")
+
+            job = _FileJob(source, target, suite, meta)
+            pending = []
+            for index, test_case in enumerate(suite):
+                if responses.get(test_case["id"]):
+                    pending.append(index)
+                else:
+                    job.rows[index] = evaluator.missing_result(test_case)
+            job.remaining = len(pending) + 1  # held until every test is submitted
+            pending.sort(key=lambda i: -history.expected(suite[i]))
+            for index in pending:
+                slots.acquire()
+                test_case = suite[index]
+                future = pool.submit(
+                    evaluator.evaluate_single, responses[test_case["id"]], test_case,
+                    compiled.rules[test_case["id"]], history.timeouts(test_case["id"]),
+                )
+                future.add_done_callback(lambda f, j=job, i=index: on_evaluated(j, i, f))
+            del responses
+            with job.lock:
+                job.remaining -= 1
+                last = job.remaining == 0
+            if last:
+                finish(job)
+
+    try:
+        history.save()
+    except OSError as exc:
+        logger.warning(f"Could not save evaluation timings: {exc}")
+    return summaries
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m pipeline.run evaluate",
+        description="Re-score archived responses against a suite without calling the LLM",
+    )
+    parser.add_argument("files", nargs="+", help="Response files (JSON/JSONL) or directories of them")
+    parser.add_argument("--suite", default="standard", help="Test suite name")
+    parser.add_argument("--suite-version", type=int, help="Pin a suite snapshot version (default: current)")
+    parser.add_argument(
+        "--output-dir", "-o",
+        help="Directory for <name>.results.json, mirroring the inputs' subdirectories (default: next to each input)",
+    )
+    parser.add_argument("--jobs", "-j", type=int, default=os.cpu_count() or 4, help="Parallel evaluations")
+    parser.add_argument("--verbose", "-v", action="store_true")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(levelname)s: %(message)s",
+    )
+
+    paths = expand_paths(args.files)
+    if not paths:
+        parser.error("no response files found")
+    try:
+        summaries = rescore_files(
+            paths, args.suite, args.suite_version,
+            Path(args.output_dir) if args.output_dir else None, args.jobs,
+        )
+    except ValueError as exc:
+        parser.exit(1, f"evaluate failed: {exc}\n")
+    print(json.dumps(sorted(summaries, key=lambda s: s["source"]), indent=2))
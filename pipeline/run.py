@@ -1,27 +1,104 @@
 """Core benchmark pipeline. Load suite, call LLM, evaluate, return JSON."""
 
 import argparse
+import hashlib
 import json
 import logging
+import os
+import queue
 import sys
 import threading
-from typing import Dict, Generator, List, Optional
-
-import requests
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Generator, List, Optional, TextIO, Tuple
 
+from .adaptive import SequentialEstimator, stratified_order
+from .budget import RunBudget
+from .compiled import CompiledSuite, compile_suite
 from .evaluator import Evaluator
-from .llm import call_llm
-from .validate import load_suite, validate_suite
+from .llm import call_llm, call_llm_samples
+from .profiling import follow
+from .sampling import combine_samples, sampling_summary
+from .scheduling import FairSlots, PriorityExecutor, get_history
+from .subset import parse_shard, select_tests, shard_tests
+from .validate import get_store, validate_suite
+
+if TYPE_CHECKING:
+    from .profiling import RunProfiler
 
 logger = logging.getLogger(__name__)
 
+EVAL_WORKERS = os.cpu_count() or 4
+
+# Seconds between queue position checks while a tenant's work is waiting.
+QUEUE_POLL_SECONDS = 1.0
+
+_evaluation_backend = None
+_llm_slots: Optional[FairSlots] = None
+
+
+def set_evaluation_backend(backend) -> None:
+    """Route evaluations through ``backend.submit(code, test_case, timeouts=, priority=, tenant=) -> Future``.
+
+    The server installs an ``EvaluationCoordinator`` so evaluations fan out
+    to registered workers. Without a backend, runs use a local thread pool.
+    A backend with ``queue_status(tenant)`` reports queue positions.
+    """
+    global _evaluation_backend
+    _evaluation_backend = backend
+
+
+def set_llm_slots(slots: Optional[FairSlots]) -> None:
+    """Send every LLM request through ``slots``, shared fairly by tenant across runs."""
+    global _llm_slots
+    _llm_slots = slots
+
 
 def fetch_docs(url: str) -> str:
+    import requests
+
     response = requests.get(url, timeout=60)
     response.raise_for_status()
     return response.text
 
 
+def _resolve_docs(doc_url: Optional[str], doc_content: Optional[str]) -> str:
+    if doc_url:
+        return fetch_docs(doc_url)
+    return doc_content or ""
+
+
+def _load_pinned_suite(suite_name: str, suite_version: Optional[int]) -> Tuple[int, List[Dict]]:
+    """Resolve the suite version before loading so the run is pinned to one snapshot."""
+    store = get_store()
+    if suite_version is None:
+        suite_version = store.current_version(suite_name)
+    return suite_version, store.load(suite_name, suite_version)
+
+
+def _apply_selection(suite: List[Dict], selection: Optional[Dict]) -> Tuple[List[Dict], Dict]:
+    """Narrow the suite to the requested sub-suite. Returns (tests, meta fields)."""
+    if not selection:
+        return suite, {"partial": False}
+    selected = select_tests(suite, **selection)
+    return selected, {
+        "partial": len(selected) < len(suite),
+        "selection": selection,
+        "suite_tests_total": len(suite),
+    }
+
+
+def _apply_shard(suite: List[Dict], shard: Optional[Tuple[int, int]]) -> Tuple[List[Dict], Dict]:
+    """Narrow the (selected) suite to shard (i, N). Returns (tests, meta fields)."""
+    if not shard:
+        return suite, {}
+    index, count = shard
+    tests = shard_tests(suite, index, count)
+    if not tests:
+        raise ValueError(f"Shard {index}/{count} has no tests ({len(suite)} tests in {count} shards)")
+    return tests, {"partial": True, "shard": {"index": index, "count": count, "tests": len(tests)}}
+
+
 def run_benchmark(
     api_key: str,
     model: str,
@@ -32,34 +109,70 @@ def run_benchmark(
     batch_size: int = 45,
     temperature: float = 0.1,
     skip_validation: bool = False,
+    suite_version: Optional[int] = None,
+    selection: Optional[Dict] = None,
+    adaptive: Optional[Dict] = None,
+    samples: int = 1,
+    budget: Optional[Dict] = None,
+    shard: Optional[Tuple[int, int]] = None,
+    profiler: Optional["RunProfiler"] = None,
 ) -> Dict:
-    """Run the full benchmark pipeline and return results as a dict."""
-    suite = load_suite(suite_name)
-
-    if not skip_validation:
-        validation = validate_suite(suite)
-        if not validation["valid"]:
-            return {"error": "Suite validation failed", "issues": validation["issues"]}
-
-    if doc_url:
-        doc_text = fetch_docs(doc_url)
-    elif doc_content:
-        doc_text = doc_content
-    else:
-        doc_text = ""
-
-    responses = call_llm(
-        api_key=api_key, model=model, suite=suite, doc_content=doc_text,
-        max_tokens=max_tokens, batch_size=batch_size, temperature=temperature,
+    """Run the full benchmark pipeline and return results as a dict.
+
+    ``selection`` holds keyword arguments for ``select_tests`` (categories,
+    levels, test_ids, types, sample, seed) to run a sub-suite. ``adaptive``
+    enables sequential early stopping, ``samples`` > 1 repeated sampling
+    with pass@k, ``budget`` token/cost limits and ``shard`` one slice of a
+    split run (see ``run_benchmark_streaming``). With ``profiler`` the run
+    is profiled stage by stage; the caller marks serialization and stops it.
+    """
+    events = run_benchmark_streaming(
+        api_key=api_key, model=model, suite_name=suite_name, doc_url=doc_url,
+        doc_content=doc_content, max_tokens=max_tokens, batch_size=batch_size,
+        temperature=temperature, suite_version=suite_version, selection=selection,
+        adaptive=adaptive, skip_validation=skip_validation, samples=samples, budget=budget,
+        shard=shard,
+    )
+    for event in profiler.wrap(events) if profiler else events:
+        if event["type"] == "estimate":
+            _log_estimate(event)
+        elif event["type"] in ("result", "error"):
+            return {k: v for k, v in event.items() if k != "type"}
+    return {"error": "Run ended without a result"}
+
+
+def run_benchmark_jsonl(out: TextIO, profiler: Optional["RunProfiler"] = None, **kwargs) -> Dict:
+    """Run the benchmark, writing one JSON line per evaluated test and a final summary line.
+
+    Each line is flushed as soon as it is written, so ``tail -f`` shows
+    progress. Takes ``run_benchmark`` keyword arguments and returns the
+    summary (compact per-test rows, no code) or error dict.
+    """
+    events = run_benchmark_streaming(stream_results=True, **kwargs)
+    for event in profiler.wrap(events) if profiler else events:
+        if event["type"] == "test":
+            record = event.get("result") or {k: v for k, v in event.items() if k != "type"}
+            if "sample" in event:
+                record = {**record, "sample": event["sample"]}
+            out.write(json.dumps({"type": "test", **record}) + "\n")
+            out.flush()
+        elif event["type"] == "estimate":
+            _log_estimate(event)
+        elif event["type"] in ("result", "error"):
+            summary = {k: v for k, v in event.items() if k != "type"}
+            out.write(json.dumps({"type": "summary" if event["type"] == "result" else "error", **summary}) + "\n")
+            out.flush()
+            return summary
+    summary = {"error": "Run ended without a result"}
+    out.write(json.dumps({"type": "error", **summary}) + "\n")
+    return summary
+
+
+def _log_estimate(event: Dict):
+    logger.info(
+        f"{event['tests_spent']}/{event['tests_total']} tests: "
+        f"{event['estimate']}% [{event['ci_low']}, {event['ci_high']}]"
     )
-
-    evaluator = Evaluator()
-    results = evaluator.evaluate_all(responses, suite)
-    results["meta"] = {
-        "model": model, "suite": suite_name, "doc_url": doc_url,
-        "max_tokens": max_tokens, "batch_size": batch_size, "temperature": temperature,
-    }
-    return results
 
 
 def run_benchmark_streaming(
@@ -71,75 +184,476 @@ def run_benchmark_streaming(
     max_tokens: int = 16000,
     batch_size: int = 45,
     temperature: float = 0.1,
+    suite_version: Optional[int] = None,
+    selection: Optional[Dict] = None,
+    adaptive: Optional[Dict] = None,
+    skip_validation: bool = False,
+    samples: int = 1,
+    budget: Optional[Dict] = None,
+    shard: Optional[Tuple[int, int]] = None,
+    stream_results: bool = False,
+    tenant: Optional[str] = None,
 ) -> Generator[Dict, None, None]:
-    """Run benchmark with progress events yielded as dicts."""
-    suite = load_suite(suite_name)
+    """Run benchmark with progress events yielded as dicts.
+
+    With ``adaptive`` set ({target_width, confidence, min_tests, baseline,
+    seed}), batches run one at a time in random stratified order and an
+    ``estimate`` event with the running confidence interval follows each
+    evaluated batch; the run stops once the interval is narrow enough or
+    the comparison against ``baseline`` is decided.
+
+    With ``samples`` > 1 every test is answered that many times; each row's
+    score is the mean over samples and ``sampling`` reports pass@k and
+    variance per test and category.
+
+    With ``budget`` ({max_input_tokens, max_output_tokens, max_cost,
+    input_price, output_price, prices}, see ``RunBudget.from_dict``) each
+    batch reserves its estimated tokens before it is sent; once the budget is
+    exhausted the remaining batches are cancelled and the result is flagged
+    partial, with the spend in ``meta.budget``.
+
+    With ``shard`` (i, N) only the i-th of N stratified slices of the
+    selected tests is run; ``python -m pipeline.run merge`` combines the
+    shard results into the result of the whole run.
+
+    With ``stream_results`` every ``test`` event carries its full result row
+    (``result``) and the final ``result`` event lists only compact rows
+    without code or checks, so memory stays flat however large the suite.
+
+    ``tenant`` (the server passes a hash of the API key) is the fair-share
+    identity for the LLM slots and evaluation backend. While the run's work
+    waits behind other tenants, ``queue`` events report its position and ETA.
+    """
+    if samples > 1 and adaptive:
+        raise ValueError("samples and adaptive cannot be combined")
+    if shard and adaptive:
+        raise ValueError("shard and adaptive cannot be combined")
+    run_budget = RunBudget.from_dict(budget, model)
+    suite_version, suite = _load_pinned_suite(suite_name, suite_version)
+    suite, selection_meta = _apply_selection(suite, selection)
+    suite, shard_meta = _apply_shard(suite, shard)
     num_batches = (len(suite) + batch_size - 1) // batch_size
 
     yield {"type": "status", "stage": "validating", "total_batches": num_batches, "total_tests": len(suite)}
 
-    validation = validate_suite(suite)
-    if not validation["valid"]:
-        yield {"type": "error", "error": "Suite validation failed", "issues": validation["issues"]}
-        return
+    if not skip_validation:
+        validation = validate_suite(suite)
+        if not validation["valid"]:
+            yield {"type": "error", "error": "Suite validation failed", "issues": validation["issues"]}
+            return
 
     yield {"type": "status", "stage": "fetching_docs"}
 
-    if doc_url:
-        doc_text = fetch_docs(doc_url)
-    elif doc_content:
-        doc_text = doc_content
-    else:
-        doc_text = ""
+    doc_text = _resolve_docs(doc_url, doc_content)
+    compiled = compile_suite(suite)
+    meta = {
+        "model": model,
+        "suite": suite_name,
+        "suite_version": suite_version,
+        "doc_url": doc_url,
+        "doc_sha256": hashlib.sha256(doc_text.encode()).hexdigest(),
+        "max_tokens": max_tokens,
+        "batch_size": batch_size,
+        "temperature": temperature,
+        **selection_meta,
+        **shard_meta,
+    }
 
-    yield {"type": "status", "stage": "llm_calling", "total_batches": num_batches}
+    if adaptive:
+        yield from _run_adaptive(
+            api_key, model, suite, doc_text, max_tokens, batch_size, temperature, adaptive, meta, compiled,
+            stream_results, run_budget, tenant,
+        )
+        return
 
-    batch_events = []
-    batch_lock = threading.Lock()
+    yield {"type": "status", "stage": "llm_calling", "total_batches": num_batches}
 
-    def on_batch_complete(batch_num: int, total: int, error: Optional[str]):
-        with batch_lock:
-            batch_events.append({
-                "type": "batch",
-                "batch": batch_num,
-                "total_batches": total,
-                "status": "error" if error else "done",
-                "error": error,
-            })
-
-    responses = call_llm(
-        api_key=api_key, model=model, suite=suite, doc_content=doc_text,
-        max_tokens=max_tokens, batch_size=batch_size, temperature=temperature,
-        on_batch_complete=on_batch_complete,
+    evaluator = Evaluator()
+    # Historically slow tests go into the first batches so their evaluation starts early.
+    evaluated = yield from _llm_and_evaluate(
+        evaluator, api_key, model, get_history().order(suite), doc_text, max_tokens, batch_size,
+        temperature, samples=samples, compiled=compiled, stream_results=stream_results, budget=run_budget,
+        tenant=tenant,
     )
 
-    for event in batch_events:
-        yield event
-
     yield {"type": "status", "stage": "evaluating"}
 
+    if samples > 1:
+        k_values = [k for k in (1, 5, 10) if k < samples] + [samples]
+        rows = [
+            combine_samples(
+                [evaluated.get(t["id"], {}).get(s) or evaluator.missing_result(t) for s in range(samples)],
+                k_values,
+            )
+            for t in suite
+        ]
+        results = evaluator.summarize(rows)
+        unique = len({id(r) for per_test in evaluated.values() for r in per_test.values()})
+        responded = sum(len(per_test) for per_test in evaluated.values())
+        results["sampling"] = sampling_summary(rows, samples, unique, responded - unique)
+        meta["samples"] = samples
+    else:
+        results = evaluator.summarize([
+            evaluated.get(t["id"], {}).get(0) or evaluator.missing_result(t) for t in suite
+        ])
+    if run_budget:
+        meta["budget"] = run_budget.summary()
+        meta["partial"] = meta["partial"] or run_budget.exhausted
+    results["meta"] = meta
+
+    yield {"type": "result", **results}
+
+
+def _llm_and_evaluate(
+    evaluator: Evaluator,
+    api_key: str,
+    model: str,
+    suite: List[Dict],
+    doc_text: str,
+    max_tokens: int,
+    batch_size: int,
+    temperature: float,
+    batch_offset: int = 0,
+    total_batches: Optional[int] = None,
+    samples: int = 1,
+    compiled: Optional[CompiledSuite] = None,
+    stream_results: bool = False,
+    budget: Optional[RunBudget] = None,
+    tenant: Optional[str] = None,
+) -> Generator[Dict, None, Dict[str, Dict[int, Dict]]]:
+    """Stream LLM responses and evaluate each test as soon as its code arrives.
+
+    Yields ``batch`` and ``test`` events live while the LLM call runs in a
+    background thread, and returns {test_id: {sample: result}} for the
+    responses that arrived. Queued evaluations run longest-expected-first
+    with timeouts from the duration history, and new durations are saved
+    back to it. With ``samples`` > 1 every test is sampled that
+    many times and identical code for the same test is evaluated only once.
+    With ``stream_results`` each ``test`` event carries the full result row
+    and only its compact form is kept for the return value. With ``tenant``
+    LLM requests take fair server-wide slots and ``queue`` events report
+    where the tenant's waiting work stands.
+    Raises RuntimeError if every batch failed.
+    """
+    suite_by_id = {t["id"]: t for t in suite}
+    compiled = compiled or compile_suite(suite)
+    events: "queue.Queue[Optional[Dict]]" = queue.Queue()
+    lock = threading.Lock()
+    # Evaluations are keyed by (test_id, code); finished ones move from
+    # ``pending`` to ``done`` so no future outlives its result.
+    pending: Dict[Tuple[str, bytes], object] = {}
+    done: Dict[Tuple[str, bytes], Dict] = {}
+    submitted = 0
+    sample_keys: Dict[Tuple[str, int], Tuple[str, bytes]] = {}
+    llm_error: List[Exception] = []
+    backend = _evaluation_backend
+    pool = None if backend else PriorityExecutor(EVAL_WORKERS)
+    history = get_history()
+    slots = _llm_slots if tenant is not None else None
+    queues = {}
+    if slots:
+        queues["llm"] = slots.status
+    if tenant is not None and hasattr(backend, "queue_status"):
+        queues["eval"] = backend.queue_status
+    queue_seen: Dict[str, int] = {}
+
+    def queue_events() -> List[Dict]:
+        """A ``queue`` event for each resource where the number of other tenants'
+        requests ahead of this tenant's next one changed (0: next or not waiting)."""
+        changed = []
+        for resource, status_of in queues.items():
+            status = status_of(tenant)
+            position = status["position"] if status else 0
+            if position != queue_seen.get(resource, 0):
+                queue_seen[resource] = position
+                event = {"type": "queue", "resource": resource, "position": position}
+                if status:
+                    event["waiting"] = status["waiting"]
+                    event["eta_seconds"] = status["eta_seconds"]
+                changed.append(event)
+        return changed
+
+    def on_evaluated(key: Tuple[str, str], sample: int, future):
+        test_id = key[0]
+        if future.cancelled():
+            with lock:
+                pending.pop(key, None)
+            return
+        try:
+            result = future.result()
+        except Exception as exc:
+            logger.error(f"Evaluation of {test_id} failed: {exc}")
+            with lock:
+                pending.pop(key, None)
+            events.put({"type": "test", "test_id": test_id, "error": str(exc)})
+            return
+        history.record(test_id, result.get("durations"), result.get("timed_out"))
+        with lock:
+            pending.pop(key, None)
+            done[key] = evaluator.compact_result(result) if stream_results else result
+        event = {
+            "type": "test", "test_id": test_id, "score": result["score"],
+            "max_score": result["max_score"], "jac_valid": result["jac_valid"],
+        }
+        if samples > 1:
+            event["sample"] = sample
+        if stream_results:
+            event["result"] = result
+        events.put(event)
+
+    def on_response(test_id: str, sample: int, code: str):
+        nonlocal submitted
+        if test_id not in suite_by_id or not code:
+            return
+        # Keyed by a digest so identical samples share one evaluation without keeping the code.
+        key = (test_id, hashlib.sha256(code.strip().encode()).digest())
+        with lock:
+            sample_keys[(test_id, sample)] = key
+            if key in pending or key in done:
+                return
+            test_case = suite_by_id[test_id]
+            priority, timeouts = history.expected(test_case), history.timeouts(test_id)
+            if backend:
+                future = backend.submit(code, test_case, timeouts=timeouts, priority=priority, tenant=tenant or "")
+            else:
+                future = pool.submit(
+                    priority, follow(evaluator.evaluate_single), code, test_case, compiled.rules[test_id], timeouts,
+                )
+            pending[key] = future
+            submitted += 1
+        future.add_done_callback(lambda f, k=key, s=sample: on_evaluated(k, s, f))
+
+    def on_batch_complete(batch_num: int, total: int, error: Optional[str]):
+        events.put({
+            "type": "batch",
+            "batch": batch_num + batch_offset,
+            "total_batches": total_batches or total,
+            "status": "error" if error else "done",
+            "error": error,
+        })
+
+    slot = (lambda: slots.slot(tenant)) if slots else None
+
+    # Set when this generator finishes or is closed early, so the LLM stops sending batches.
+    cancelled = threading.Event()
+
+    def run_llm():
+        try:
+            if samples > 1:
+                call_llm_samples(
+                    api_key=api_key, model=model, suite=suite, doc_content=doc_text, samples=samples,
+                    max_tokens=max_tokens, batch_size=batch_size, temperature=temperature,
+                    on_batch_complete=on_batch_complete, on_response=on_response, compiled=compiled,
+                    budget=budget, slot=slot, cancel=cancelled,
+                )
+            else:
+                call_llm(
+                    api_key=api_key, model=model, suite=suite, doc_content=doc_text,
+                    max_tokens=max_tokens, batch_size=batch_size, temperature=temperature,
+                    on_batch_complete=on_batch_complete,
+                    on_response=lambda test_id, code: on_response(test_id, 0, code),
+                    compiled=compiled, budget=budget, slot=slot, cancel=cancelled,
+                )
+        except Exception as exc:
+            llm_error.append(exc)
+        finally:
+            events.put(None)
+
+    threading.Thread(target=follow(run_llm), daemon=True).start()
+    try:
+        llm_done, tests_seen = False, 0
+        while not llm_done or tests_seen < submitted:
+            if queues:
+                yield from queue_events()
+                try:
+                    event = events.get(timeout=QUEUE_POLL_SECONDS)
+                except queue.Empty:
+                    continue
+            else:
+                event = events.get()
+            if event is None:
+                llm_done = True
+                continue
+            if event["type"] == "test":
+                tests_seen += 1
+            yield event
+    finally:
+        cancelled.set()
+        # Outside the lock: cancelling runs on_evaluated, which takes it.
+        with lock:
+            unfinished = list(pending.values())
+        for future in unfinished:
+            future.cancel()
+        if pool:
+            pool.shutdown(wait=False)
+        try:
+            history.save()
+        except OSError as exc:
+            logger.warning(f"Could not save evaluation timings: {exc}")
+
+    if llm_error:
+        raise llm_error[0]
+
+    evaluated: Dict[str, Dict[int, Dict]] = {}
+    for (test_id, sample), key in sample_keys.items():
+        if key in done:
+            evaluated.setdefault(test_id, {})[sample] = done[key]
+    return evaluated
+
+
+def _run_adaptive(
+    api_key: str,
+    model: str,
+    suite: List[Dict],
+    doc_text: str,
+    max_tokens: int,
+    batch_size: int,
+    temperature: float,
+    adaptive: Dict,
+    meta: Dict,
+    compiled: Optional[CompiledSuite] = None,
+    stream_results: bool = False,
+    budget: Optional[RunBudget] = None,
+    tenant: Optional[str] = None,
+) -> Generator[Dict, None, None]:
+    ordered = stratified_order(suite, seed=adaptive.get("seed", 0))
+    estimator = SequentialEstimator(
+        population=len(suite),
+        target_width=adaptive.get("target_width", 5.0),
+        confidence=adaptive.get("confidence", 0.95),
+        min_tests=adaptive.get("min_tests", min(20, len(suite))),
+        baseline=adaptive.get("baseline"),
+    )
+    num_batches = (len(ordered) + batch_size - 1) // batch_size
     evaluator = Evaluator()
-    results = evaluator.evaluate_all(responses, suite)
+    evaluated: Dict[str, Dict] = {}
+    estimate: Dict = {}
+    llm_error: Optional[str] = None
+
+    yield {"type": "status", "stage": "adaptive", "total_batches": num_batches}
+
+    for i in range(num_batches):
+        batch = ordered[i * batch_size : (i + 1) * batch_size]
+        try:
+            batch_results = yield from _llm_and_evaluate(
+                evaluator, api_key, model, batch, doc_text, max_tokens, batch_size, temperature,
+                batch_offset=i, total_batches=num_batches, compiled=compiled,
+                stream_results=stream_results, budget=budget, tenant=tenant,
+            )
+        except RuntimeError as exc:
+            # Unanswered tests must not count as failures in the estimate: with
+            # nothing evaluated yet the run fails, otherwise it stops here.
+            if not (budget and budget.exhausted):
+                if not evaluated:
+                    raise
+                llm_error = str(exc)
+                logger.warning(f"Adaptive run stopped after {len(evaluated)} tests: {exc}")
+            break
+        if budget and budget.exhausted and not batch_results:
+            break
+
+        for test_case in batch:
+            result = batch_results.get(test_case["id"], {}).get(0) or evaluator.missing_result(test_case)
+            evaluated[test_case["id"]] = result
+            estimator.add(result)
+
+        estimate = estimator.estimate()
+        yield {"type": "estimate", "batch": i + 1, **estimate}
+        if estimate["stop_reason"]:
+            break
+        if budget and budget.exhausted:
+            break
+
+    spent = [t for t in suite if t["id"] in evaluated]
+    results = evaluator.summarize([evaluated[t["id"]] for t in spent])
     results["meta"] = {
-        "model": model, "suite": suite_name, "doc_url": doc_url,
-        "max_tokens": max_tokens, "batch_size": batch_size, "temperature": temperature,
+        **meta,
+        "partial": meta["partial"] or len(spent) < len(suite),
+        "adaptive": {
+            "tests_spent": len(spent),
+            "tests_available": len(suite),
+            "stop_reason": estimate.get("stop_reason") or (
+                "llm_failed" if llm_error else "budget" if budget and budget.exhausted else "exhausted"
+            ),
+            "estimate": estimate.get("estimate"),
+            "ci_low": estimate.get("ci_low"),
+            "ci_high": estimate.get("ci_high"),
+            "confidence": estimator.confidence,
+            "target_width": estimator.target_width,
+            "comparison": estimate.get("comparison"),
+        },
     }
-
+    if llm_error:
+        results["meta"]["adaptive"]["error"] = llm_error
+    if budget:
+        results["meta"]["budget"] = budget.summary()
     yield {"type": "result", **results}
 
 
+def _shard_arg(spec: str) -> Tuple[int, int]:
+    try:
+        return parse_shard(spec)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc))
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Run Jac DocBench pipeline")
+    if sys.argv[1:2] == ["evaluate"]:
+        from .rescore import main as evaluate_main
+
+        return evaluate_main(sys.argv[2:])
+    if sys.argv[1:2] == ["merge"]:
+        from .merge import main as merge_main
+
+        return merge_main(sys.argv[2:])
+
+    parser = argparse.ArgumentParser(
+        description="Run Jac DocBench pipeline",
+        epilog=(
+            "Re-score saved responses without the LLM: python -m pipeline.run evaluate --help. "
+            "Combine --shard outputs: python -m pipeline.run merge --help"
+        ),
+    )
     parser.add_argument("--api-key", required=True, help="OpenRouter API key")
     parser.add_argument("--model", required=True, help="Model ID (e.g. google/gemini-3-flash-preview)")
     parser.add_argument("--suite", default="standard", help="Test suite name")
+    parser.add_argument("--suite-version", type=int, help="Pin a suite snapshot version (default: current)")
     parser.add_argument("--doc-url", help="URL to fetch documentation from")
     parser.add_argument("--doc-content", help="Raw documentation text")
     parser.add_argument("--max-tokens", type=int, default=16000)
     parser.add_argument("--batch-size", type=int, default=45)
     parser.add_argument("--temperature", type=float, default=0.1)
+    parser.add_argument("--category", action="append", dest="categories", help="Only run this category (repeatable)")
+    parser.add_argument("--level", action="append", type=int, dest="levels", help="Only run this level (repeatable)")
+    parser.add_argument("--test-id", action="append", dest="test_ids", help="Only run test IDs matching this glob (repeatable)")
+    parser.add_argument("--type", action="append", dest="types", help="Only run this test type (repeatable)")
+    parser.add_argument("--sample", help="Stratified sample: test count, fraction, or percentage (e.g. 20, 0.1, 10%%)")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for --sample")
+    parser.add_argument("--adaptive", action="store_true", help="Stop early once the score interval is narrow enough")
+    parser.add_argument("--target-width", type=float, default=5.0, help="Adaptive: CI width to stop at, in percentage points")
+    parser.add_argument("--confidence", type=float, default=0.95, help="Adaptive: confidence level")
+    parser.add_argument("--baseline", help="Adaptive: baseline results JSON file or percentage to compare against")
+    parser.add_argument("--samples", "-k", type=int, default=1, help="Completions per test; reports pass@k")
+    parser.add_argument(
+        "--shard", type=_shard_arg, metavar="i/N",
+        help="Run only the i-th of N stratified slices of the selected tests (combine with merge)",
+    )
+    parser.add_argument("--max-input-tokens", type=int, help="Budget: stop sending batches past this many prompt tokens")
+    parser.add_argument("--max-output-tokens", type=int, help="Budget: stop sending batches past this many completion tokens")
+    parser.add_argument("--max-cost", type=float, help="Budget: stop sending batches past this cost in USD (needs prices)")
+    parser.add_argument("--input-price", type=float, help="Budget: USD per million prompt tokens for --model")
+    parser.add_argument("--output-price", type=float, help="Budget: USD per million completion tokens for --model")
     parser.add_argument("--output", "-o", help="Output file path (default: stdout)")
+    parser.add_argument(
+        "--format", choices=["json", "jsonl"], default="json",
+        help="json: one document at the end; jsonl: a line per test as evaluated, then a summary line",
+    )
     parser.add_argument("--skip-validation", action="store_true")
+    parser.add_argument("--record", action="store_true", help="Append the result to the score matrix (results/matrix)")
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="Profile the run (cProfile + tracemalloc per stage); reports go next to --output or in results/profiles",
+    )
     parser.add_argument("--verbose", "-v", action="store_true")
     args = parser.parse_args()
 
@@ -148,13 +662,72 @@ def main():
         format="%(levelname)s: %(message)s",
     )
 
-    results = run_benchmark(
+    selection = {
+        key: getattr(args, key)
+        for key in ("categories", "levels", "test_ids", "types", "sample")
+        if getattr(args, key)
+    }
+    if selection:
+        selection["seed"] = args.seed
+
+    adaptive = None
+    if args.adaptive:
+        adaptive = {"target_width": args.target_width, "confidence": args.confidence, "seed": args.seed}
+        if args.baseline:
+            try:
+                adaptive["baseline"] = float(args.baseline)
+            except ValueError:
+                with open(args.baseline) as f:
+                    adaptive["baseline"] = json.load(f)
+
+    budget = {
+        key: getattr(args, key)
+        for key in ("max_input_tokens", "max_output_tokens", "max_cost", "input_price", "output_price")
+        if getattr(args, key) is not None
+    }
+
+    run_args = dict(
         api_key=args.api_key, model=args.model, suite_name=args.suite,
-        doc_url=args.doc_url, doc_content=args.doc_content,
+        suite_version=args.suite_version, doc_url=args.doc_url, doc_content=args.doc_content,
         max_tokens=args.max_tokens, batch_size=args.batch_size,
         temperature=args.temperature, skip_validation=args.skip_validation,
+        selection=selection or None, adaptive=adaptive, samples=args.samples,
+        budget=budget or None, shard=args.shard,
     )
 
+    profiler = None
+    if args.profile:
+        from .profiling import RunProfiler
+
+        if args.output:
+            output = Path(args.output)
+            profiler = RunProfiler(output.stem, output.parent)
+        else:
+            profiler = RunProfiler(time.strftime("run-%Y%m%d-%H%M%S"))
+
+    if args.format == "jsonl":
+        if args.output:
+            with open(args.output, "w") as f:
+                results = run_benchmark_jsonl(f, profiler=profiler, **run_args)
+            logger.info(f"Results written to {args.output}")
+        else:
+            results = run_benchmark_jsonl(sys.stdout, profiler=profiler, **run_args)
+        if profiler:
+            profiler.stop()
+    else:
+        results = run_benchmark(profiler=profiler, **run_args)
+
+    if args.record and "results" in results:
+        from .matrix import ScoreMatrix
+
+        ScoreMatrix().record(results)
+
+    if args.format == "jsonl":
+        return
+
+    if profiler:
+        profiler.mark("serialization")
+        results.setdefault("meta", {})["profile"] = profiler.paths()
     output = json.dumps(results, indent=2)
     if args.output:
         with open(args.output, "w") as f:
@@ -162,6 +735,8 @@ def main():
         logger.info(f"Results written to {args.output}")
     else:
         print(output)
+    if profiler:
+        profiler.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,78 @@
+"""Repeated-sampling statistics: pass@k, mean and variance per test and category."""
+
+from math import comb
+from statistics import mean, pvariance
+from typing import Dict, List, Optional
+
+
+def pass_at_k(n: int, c: int, k: int) -> float:
+    """Unbiased pass@k estimate from n samples of which c passed (Chen et al., 2021)."""
+    if n - c < k:
+        return 1.0
+    return 1.0 - comb(n - c, k) / comb(n, k)
+
+
+def _passed(result: Dict) -> bool:
+    return result["max_score"] > 0 and result["score"] >= result["max_score"]
+
+
+def _responded(result: Dict) -> bool:
+    return result.get("responded", bool(result.get("code")))
+
+
+def combine_samples(sample_results: List[Dict], k_values: List[int]) -> Dict:
+    """Fold one test's per-sample result rows into a single row.
+
+    The row keeps the checks and code of the first sample that got a response
+    (so the test counts as responded if any sample did), scores the test with
+    the mean over samples, and adds per-sample scores, pass@k and variance.
+    """
+    first = next((r for r in sample_results if _responded(r)), sample_results[0])
+    n = len(sample_results)
+    scores = [r["score"] for r in sample_results]
+    passed = sum(1 for r in sample_results if _passed(r))
+    score = mean(scores)
+    max_score = first["max_score"]
+    return {
+        **first,
+        "score": round(score, 2),
+        "percentage": round(score / max_score * 100, 2) if max_score else 0,
+        "jac_valid": sum(1 for r in sample_results if r["jac_valid"]) * 2 >= n,
+        "samples": [
+            {"score": r["score"], "jac_valid": r["jac_valid"], "passed": _passed(r)}
+            for r in sample_results
+        ],
+        "score_variance": round(pvariance(scores), 4) if n > 1 else 0.0,
+        "pass_at": {str(k): round(pass_at_k(n, passed, k), 4) for k in k_values if k <= n},
+    }
+
+
+def sampling_summary(
+    rows: List[Dict], samples: int, evaluations: Optional[int] = None, deduplicated: Optional[int] = None,
+) -> Dict:
+    """Suite- and category-level pass@k, mean percentage and mean within-test variance."""
+    def aggregate(group: List[Dict]) -> Dict:
+        return {
+            "count": len(group),
+            "pass_at": {
+                k: round(mean(r["pass_at"][k] for r in group) * 100, 2)
+                for k in group[0]["pass_at"]
+            },
+            "mean_percentage": round(mean(r["percentage"] for r in group), 2),
+            "mean_score_variance": round(mean(r["score_variance"] for r in group), 4),
+        }
+
+    by_category: Dict[str, List[Dict]] = {}
+    for r in rows:
+        by_category.setdefault(r["category"], []).append(r)
+
+    summary = {
+        "samples": samples,
+        **aggregate(rows),
+        "category_breakdown": {cat: aggregate(group) for cat, group in sorted(by_category.items())},
+    }
+    if evaluations is not None:
+        summary["evaluations"] = evaluations
+    if deduplicated is not None:
+        summary["deduplicated"] = deduplicated
+    return summary
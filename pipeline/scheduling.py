@@ -0,0 +1,411 @@
+"""History-aware evaluation scheduling and fair sharing between tenants.
+
+``TimingHistory`` keeps the recent ``jac check`` and ``jac test`` durations
+of every test across runs (``results/timings.json``). Runs use it to send
+the slowest tests to the LLM first, evaluate longest-first through a
+``PriorityExecutor``, and derive per-test timeouts from the observed p99
+instead of fixed constants.
+
+``FairQueue`` orders work across tenants (API keys) by weighted fair
+queuing. ``PriorityExecutor`` and the server-wide ``FairSlots`` for LLM
+requests use it, so one tenant's large suite cannot starve the others.
+"""
+
+import fcntl
+import hashlib
+import heapq
+import itertools
+import json
+import math
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from pathlib import Path
+from statistics import median
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+RESULTS_DIR = Path(__file__).parent.parent / "results"
+
+# phase: (default timeout, floor, ceiling) in seconds
+PHASES = {
+    "check": (10.0, 2.0, 60.0),
+    "functional": (30.0, 5.0, 120.0),
+}
+TIMEOUT_MARGIN = 1.5
+MAX_SAMPLES = 50
+# Completed runs needed before a p99 replaces the default timeout.
+MIN_SAMPLES = 20
+
+# Expected seconds for tests without history: functional tests run ``jac test`` too.
+PRIOR_SECONDS = {"check": 1.0, "functional": 5.0}
+
+# Smoothing of the mean slot hold time behind queue ETAs.
+HOLD_SMOOTHING = 0.2
+
+
+def key_id(api_key: str) -> str:
+    """Short, stable identifier of an API key (the tenant) that is safe to log and show to admins."""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:12]
+
+
+def timeouts_key(phase: str) -> str:
+    """History key of the timeouts a phase hit."""
+    return f"{phase}_timeouts"
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+
+class TimingHistory:
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else RESULTS_DIR / "timings.json"
+        self._lock = threading.Lock()
+        self._data: Optional[Dict[str, Dict[str, List[float]]]] = None
+        self._new: Dict[str, Dict[str, List[float]]] = {}
+        self._phase_p99: Dict[str, Optional[float]] = {}
+
+    def _loaded(self) -> Dict[str, Dict[str, List[float]]]:
+        if self._data is None:
+            try:
+                self._data = json.loads(self.path.read_text())
+            except (OSError, ValueError):
+                self._data = {}
+        return self._data
+
+    def record(
+        self,
+        test_id: str,
+        durations: Optional[Dict[str, float]],
+        timed_out: Optional[Dict[str, float]] = None,
+    ):
+        """Add one evaluation's per-phase durations of completed phases.
+
+        Phases that hit their timeout (``timed_out``: phase -> timeout) are
+        kept apart under ``<phase>_timeouts`` and never enter the percentiles.
+        """
+        entries = [(p, s) for p, s in (durations or {}).items() if p in PHASES]
+        entries += [(timeouts_key(p), s) for p, s in (timed_out or {}).items() if p in PHASES]
+        if not entries:
+            return
+        with self._lock:
+            data = self._loaded()
+            for key, seconds in entries:
+                samples = data.setdefault(test_id, {}).setdefault(key, [])
+                samples.append(round(seconds, 3))
+                del samples[:-MAX_SAMPLES]
+                self._new.setdefault(test_id, {}).setdefault(key, []).append(round(seconds, 3))
+            self._phase_p99.clear()
+
+    def expected(self, test_case: Dict) -> float:
+        """Expected evaluation seconds: median of recorded durations, or a prior by test type."""
+        functional = test_case.get("type") == "functional" and bool(test_case.get("test_harness"))
+        with self._lock:
+            history = self._loaded().get(test_case["id"], {})
+            total = 0.0
+            for phase in ("check", "functional") if functional else ("check",):
+                samples = history.get(phase)
+                total += median(samples) if samples else PRIOR_SECONDS[phase]
+            return total
+
+    def timeouts(self, test_id: str) -> Dict[str, float]:
+        """Per-phase timeouts: margin over the p99 of the test's completed runs
+        once it has ``MIN_SAMPLES``, else over the p99 of all tests' completed
+        runs, else the defaults; clamped to the phase's floor and ceiling."""
+        with self._lock:
+            history = self._loaded().get(test_id, {})
+            timeouts = {}
+            for phase, (default, floor, ceiling) in PHASES.items():
+                samples = history.get(phase, [])
+                if len(samples) >= MIN_SAMPLES:
+                    p99 = percentile(samples, 0.99)
+                else:
+                    p99 = self._phase_p99_locked(phase)
+                timeout = default if p99 is None else p99 * TIMEOUT_MARGIN
+                timeouts[phase] = round(min(max(timeout, floor), ceiling), 2)
+            return timeouts
+
+    def _phase_p99_locked(self, phase: str) -> Optional[float]:
+        if phase not in self._phase_p99:
+            samples = [s for per_test in self._loaded().values() for s in per_test.get(phase, [])]
+            self._phase_p99[phase] = percentile(samples, 0.99) if len(samples) >= MIN_SAMPLES else None
+        return self._phase_p99[phase]
+
+    def order(self, tests: List[Dict]) -> List[Dict]:
+        """Tests sorted longest-expected-first (stable for ties)."""
+        return sorted(tests, key=lambda t: -self.expected(t))
+
+    def save(self):
+        """Merge samples recorded since the last save into the history file."""
+        with self._lock:
+            if not self._new:
+                return
+            new, self._new = self._new, {}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                try:
+                    merged = json.loads(self.path.read_text())
+                except (OSError, ValueError):
+                    merged = {}
+                for test_id, phases in new.items():
+                    for phase, samples in phases.items():
+                        kept = merged.setdefault(test_id, {}).setdefault(phase, [])
+                        kept.extend(samples)
+                        del kept[:-MAX_SAMPLES]
+                tmp = self.path.with_name(self.path.name + ".tmp")
+                tmp.write_text(json.dumps(merged))
+                tmp.replace(self.path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        with self._lock:
+            # Keep samples recorded while saving on top of the merged file.
+            for test_id, phases in self._new.items():
+                for phase, samples in phases.items():
+                    kept = merged.setdefault(test_id, {}).setdefault(phase, [])
+                    kept.extend(samples)
+                    del kept[:-MAX_SAMPLES]
+            self._data = merged
+            self._phase_p99.clear()
+
+
+_history: Optional[TimingHistory] = None
+
+
+def get_history() -> TimingHistory:
+    global _history
+    if _history is None:
+        _history = TimingHistory()
+    return _history
+
+
+class _Tenant:
+    __slots__ = ("vtime", "heap", "cost")
+
+    def __init__(self, vtime: float):
+        self.vtime = vtime
+        self.heap: List[Tuple[float, int, float, Any]] = []
+        self.cost = 0.0
+
+
+class FairQueue:
+    """Weighted fair queue across tenants (start-time fair queuing).
+
+    Within a tenant, items come out highest priority first and FIFO among
+    equals. Across tenants, the tenant with the lowest virtual time goes
+    next, and each item it takes advances that time by cost / weight. Busy
+    tenants therefore share dispatches in proportion to their weights. A
+    tenant that was idle rejoins at the current virtual time and gets no
+    credit for the idle period. Not thread-safe: callers hold their own lock.
+    """
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None):
+        self.weights: Dict[str, float] = dict(weights or {})
+        self._tenants: Dict[str, _Tenant] = {}
+        self._vtime = 0.0
+        self._seq = itertools.count()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def weight(self, tenant: str) -> float:
+        return max(float(self.weights.get(tenant, 1.0)), 1e-6)
+
+    def push(self, tenant: str, priority: float, item: Any, cost: float = 1.0):
+        t = self._tenants.get(tenant)
+        if t is None:
+            t = self._tenants[tenant] = _Tenant(self._vtime)
+        elif not t.heap:
+            t.vtime = max(t.vtime, self._vtime)
+        heapq.heappush(t.heap, (-priority, next(self._seq), cost, item))
+        t.cost += cost
+        self._size += 1
+
+    def pop(self) -> Any:
+        if not self._size:
+            raise IndexError("pop from an empty FairQueue")
+        name, t = min(
+            ((n, t) for n, t in self._tenants.items() if t.heap),
+            key=lambda nt: (nt[1].vtime, nt[1].heap[0][1]),
+        )
+        _, _, cost, item = heapq.heappop(t.heap)
+        t.cost -= cost
+        self._size -= 1
+        self._vtime = t.vtime
+        t.vtime += cost / self.weight(name)
+        # Idle tenants whose clock has been overtaken carry no state worth keeping.
+        for n in [n for n, u in self._tenants.items() if not u.heap and u.vtime <= self._vtime]:
+            del self._tenants[n]
+        return item
+
+    def ahead(self, tenant: str) -> Optional[int]:
+        """Items that go before ``tenant``'s next one if nothing else arrives; None if it has none queued."""
+        t = self._tenants.get(tenant)
+        if t is None or not t.heap:
+            return None
+        head = t.heap[0][1]
+        count = 0
+        for name, u in self._tenants.items():
+            if name == tenant or not u.heap:
+                continue
+            step = u.cost / len(u.heap) / self.weight(name)
+            if u.vtime < t.vtime:
+                count += min(len(u.heap), math.ceil((t.vtime - u.vtime) / step) if step else len(u.heap))
+            elif u.vtime == t.vtime and min(e[1] for e in u.heap) < head:
+                count += 1
+        return count
+
+    def waiting(self) -> Dict[str, int]:
+        return {n: len(t.heap) for n, t in self._tenants.items() if t.heap}
+
+
+def queue_status(queue: FairQueue, tenant: str, capacity: int, hold: Optional[float]) -> Optional[Dict]:
+    """Position of ``tenant``'s next item and an ETA from the mean hold time; None if nothing is queued."""
+    position = queue.ahead(tenant)
+    if position is None:
+        return None
+    eta = round((position + 1) * hold / max(capacity, 1), 1) if hold is not None else None
+    return {"position": position, "waiting": queue.waiting().get(tenant, 0), "eta_seconds": eta}
+
+
+def smoothed_mean(mean: Optional[float], sample: float) -> float:
+    return sample if mean is None else mean + HOLD_SMOOTHING * (sample - mean)
+
+
+class PriorityExecutor:
+    """Thread pool that runs queued calls in fair order across tenants,
+    highest priority first within a tenant (FIFO among equals)."""
+
+    def __init__(self, max_workers: int, weights: Optional[Dict[str, float]] = None):
+        self.max_workers = max_workers
+        self._cond = threading.Condition()
+        self._queue = FairQueue(weights)
+        self._hold: Optional[float] = None
+        self._shutdown = False
+        self._threads = [threading.Thread(target=self._work, daemon=True) for _ in range(max_workers)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, priority: float, fn: Callable, *args, tenant: str = "", cost: float = 1.0) -> Future:
+        future: Future = Future()
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new calls after shutdown")
+            self._queue.push(tenant, priority, (future, fn, args), cost)
+            self._cond.notify()
+        return future
+
+    def set_weights(self, weights: Dict[str, float]):
+        with self._cond:
+            self._queue.weights = dict(weights)
+
+    def status(self, tenant: str) -> Optional[Dict]:
+        with self._cond:
+            return queue_status(self._queue, tenant, self.max_workers, self._hold)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._shutdown:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                future, fn, args = self._queue.pop()
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.monotonic()
+            try:
+                future.set_result(fn(*args))
+            except Exception as exc:
+                future.set_exception(exc)
+            with self._cond:
+                self._hold = smoothed_mean(self._hold, time.monotonic() - started)
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting calls; queued calls still run unless cancelled."""
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for t in self._threads:
+                t.join()
+
+
+class FairSlots:
+    """Server-wide concurrency slots (e.g. LLM requests) granted in fair order across tenants."""
+
+    def __init__(self, capacity: int, weights: Optional[Dict[str, float]] = None):
+        self.capacity = capacity
+        self._cond = threading.Condition()
+        self._queue = FairQueue(weights)
+        self._free = capacity
+        self._active: Dict[str, int] = {}
+        self._hold: Optional[float] = None
+
+    @contextmanager
+    def slot(self, tenant: str, cost: float = 1.0) -> Iterator[None]:
+        """Hold one slot for the duration of the block, waiting for ``tenant``'s turn."""
+        ticket = {"granted": False, "cancelled": False}
+        with self._cond:
+            self._queue.push(tenant, 0.0, ticket, cost)
+            self._dispatch_locked()
+            try:
+                while not ticket["granted"]:
+                    self._cond.wait()
+            except BaseException:
+                if not ticket["granted"]:
+                    ticket["cancelled"] = True
+                    raise
+                self._release_locked(None)
+                raise
+            self._active[tenant] = self._active.get(tenant, 0) + 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._active[tenant] -= 1
+                if not self._active[tenant]:
+                    del self._active[tenant]
+                self._release_locked(time.monotonic() - started)
+
+    def _release_locked(self, held: Optional[float]):
+        self._free += 1
+        if held is not None:
+            self._hold = smoothed_mean(self._hold, held)
+        self._dispatch_locked()
+
+    def _dispatch_locked(self):
+        granted = False
+        while self._free and self._queue:
+            ticket = self._queue.pop()
+            if ticket["cancelled"]:
+                continue
+            ticket["granted"] = True
+            self._free -= 1
+            granted = True
+        if granted:
+            self._cond.notify_all()
+
+    def set_weights(self, weights: Dict[str, float]):
+        with self._cond:
+            self._queue.weights = dict(weights)
+
+    def status(self, tenant: str) -> Optional[Dict]:
+        with self._cond:
+            return queue_status(self._queue, tenant, self.capacity, self._hold)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "capacity": self.capacity,
+                "free": self._free,
+                "active": dict(self._active),
+                "waiting": self._queue.waiting(),
+                "mean_hold_seconds": round(self._hold, 2) if self._hold is not None else None,
+                "weights": dict(self._queue.weights),
+            }
@@ -0,0 +1,311 @@
+"""SQLite-backed suite store with atomic upserts and versioned snapshots.
+
+The JSON files in ``suites/`` stay the import/export format: a suite that is
+only on disk as JSON is imported on first access (and re-imported when the
+file changes outside the store), and every write is exported back to JSON
+with an atomic rename so the files never appear half-written.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS suites (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    source_hash TEXT
+);
+CREATE TABLE IF NOT EXISTS tests (
+    suite TEXT NOT NULL,
+    id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    category TEXT,
+    level INTEGER,
+    type TEXT,
+    body TEXT NOT NULL,
+    PRIMARY KEY (suite, id)
+);
+CREATE INDEX IF NOT EXISTS tests_category ON tests (suite, category);
+CREATE INDEX IF NOT EXISTS tests_level ON tests (suite, level);
+CREATE TABLE IF NOT EXISTS snapshots (
+    suite TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    content_hash TEXT NOT NULL,
+    total_tests INTEGER NOT NULL,
+    body TEXT NOT NULL,
+    PRIMARY KEY (suite, version)
+);
+"""
+
+
+def content_hash(suite: List[Dict]) -> str:
+    data = json.dumps(suite, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def _file_hash(path: Path) -> str:
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class SuiteStore:
+    """Suite storage: current tests indexed by id/category/level plus immutable snapshots."""
+
+    def __init__(self, suites_dir: Path, db_path: Optional[Path] = None):
+        self.suites_dir = Path(suites_dir)
+        self.db_path = Path(db_path) if db_path else self.suites_dir / "suites.db"
+        self.suites_dir.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction. BEGIN IMMEDIATE serializes concurrent writers."""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _json_path(self, name: str) -> Path:
+        return self.suites_dir / f"{name}.json"
+
+    # -- reads ---------------------------------------------------------------
+
+    def list_suites(self) -> List[str]:
+        names = {p.stem for p in self.suites_dir.glob("*.json")}
+        with self._connect() as conn:
+            names.update(row[0] for row in conn.execute("SELECT name FROM suites"))
+        return sorted(names)
+
+    def load(self, name: str, version: Optional[int] = None) -> List[Dict]:
+        """Current tests of a suite in stored order, or a pinned snapshot."""
+        self._sync_from_json(name)
+        with self._connect() as conn:
+            if version is not None:
+                row = conn.execute(
+                    "SELECT body FROM snapshots WHERE suite = ? AND version = ?", (name, version)
+                ).fetchone()
+                if not row:
+                    raise FileNotFoundError(f"Suite not found: {name}@{version}")
+                return json.loads(row[0])
+            if not self._exists(conn, name):
+                raise FileNotFoundError(f"Suite not found: {self._json_path(name)}")
+            rows = conn.execute(
+                "SELECT body FROM tests WHERE suite = ? ORDER BY position", (name,)
+            ).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def query(
+        self,
+        name: str,
+        category: Optional[str] = None,
+        level: Optional[int] = None,
+        test_id: Optional[str] = None,
+    ) -> List[Dict]:
+        """Indexed lookup of current tests by id, category and/or level."""
+        self._sync_from_json(name)
+        sql = "SELECT body FROM tests WHERE suite = ?"
+        params: list = [name]
+        if test_id is not None:
+            sql += " AND id = ?"
+            params.append(test_id)
+        if category is not None:
+            sql += " AND category = ?"
+            params.append(category)
+        if level is not None:
+            sql += " AND level = ?"
+            params.append(level)
+        with self._connect() as conn:
+            rows = conn.execute(sql + " ORDER BY position", params).fetchall()
+        return [json.loads(r[0]) for r in rows]
+
+    def current_version(self, name: str) -> int:
+        self._sync_from_json(name)
+        with self._connect() as conn:
+            row = conn.execute("SELECT version FROM suites WHERE name = ?", (name,)).fetchone()
+        if not row:
+            raise FileNotFoundError(f"Suite not found: {self._json_path(name)}")
+        return row[0]
+
+    def list_versions(self, name: str) -> List[Dict]:
+        self._sync_from_json(name)
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT version, created_at, content_hash, total_tests "
+                "FROM snapshots WHERE suite = ? ORDER BY version",
+                (name,),
+            ).fetchall()
+        return [
+            {"version": v, "created_at": ts, "content_hash": h, "total_tests": n}
+            for v, ts, h, n in rows
+        ]
+
+    # -- writes --------------------------------------------------------------
+
+    def replace(self, name: str, suite: List[Dict]) -> int:
+        """Replace the whole suite atomically. Returns the new version."""
+        with self._transaction() as conn:
+            version = self._replace_tests(conn, name, suite)
+            self._export(conn, name)
+        return version
+
+    def upsert_tests(self, name: str, tests: List[Dict]) -> Dict:
+        """Insert or update tests by id in one transaction. New tests are appended."""
+        self._sync_from_json(name)
+        added, updated = 0, 0
+        with self._transaction() as conn:
+            if not self._exists(conn, name):
+                raise FileNotFoundError(f"Suite not found: {self._json_path(name)}")
+            for test in tests:
+                tid = test.get("id")
+                if not tid:
+                    continue
+                row = conn.execute(
+                    "SELECT position FROM tests WHERE suite = ? AND id = ?", (name, tid)
+                ).fetchone()
+                if row:
+                    position = row[0]
+                    updated += 1
+                else:
+                    position = conn.execute(
+                        "SELECT COALESCE(MAX(position) + 1, 0) FROM tests WHERE suite = ?", (name,)
+                    ).fetchone()[0]
+                    added += 1
+                self._put_test(conn, name, position, test)
+            version = self._commit_version(conn, name)
+            total = conn.execute(
+                "SELECT COUNT(*) FROM tests WHERE suite = ?", (name,)
+            ).fetchone()[0]
+            self._export(conn, name)
+        return {"added": added, "updated": updated, "total": total, "version": version}
+
+    def delete(self, name: str) -> bool:
+        """Delete a suite's current tests and JSON file. Snapshots are kept for pinned runs."""
+        path = self._json_path(name)
+        with self._transaction() as conn:
+            existed = self._exists(conn, name) or path.exists()
+            conn.execute("DELETE FROM tests WHERE suite = ?", (name,))
+            conn.execute("DELETE FROM suites WHERE name = ?", (name,))
+            if path.exists():
+                path.unlink()
+        return existed
+
+    def import_json(self, name: str, path: Optional[Path] = None) -> int:
+        path = Path(path) if path else self._json_path(name)
+        with open(path) as f:
+            suite = json.load(f)
+        return self.replace(name, suite)
+
+    def export_json(self, name: str, path: Optional[Path] = None, version: Optional[int] = None) -> Path:
+        path = Path(path) if path else self._json_path(name)
+        _atomic_write_json(path, self.load(name, version))
+        return path
+
+    # -- internals -----------------------------------------------------------
+
+    @staticmethod
+    def _exists(conn: sqlite3.Connection, name: str) -> bool:
+        return conn.execute("SELECT 1 FROM suites WHERE name = ?", (name,)).fetchone() is not None
+
+    def _replace_tests(self, conn: sqlite3.Connection, name: str, suite: List[Dict]) -> int:
+        conn.execute("DELETE FROM tests WHERE suite = ?", (name,))
+        for position, test in enumerate(suite):
+            self._put_test(conn, name, position, test)
+        return self._commit_version(conn, name)
+
+    @staticmethod
+    def _put_test(conn: sqlite3.Connection, name: str, position: int, test: Dict):
+        conn.execute(
+            "INSERT OR REPLACE INTO tests (suite, id, position, category, level, type, body) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (name, test["id"], position, test.get("category"), test.get("level"),
+             test.get("type", "generate"), json.dumps(test)),
+        )
+
+    @staticmethod
+    def _commit_version(conn: sqlite3.Connection, name: str) -> int:
+        rows = conn.execute(
+            "SELECT body FROM tests WHERE suite = ? ORDER BY position", (name,)
+        ).fetchall()
+        suite = [json.loads(r[0]) for r in rows]
+        digest = content_hash(suite)
+        row = conn.execute("SELECT version FROM suites WHERE name = ?", (name,)).fetchone()
+        last = conn.execute(
+            "SELECT MAX(version) FROM snapshots WHERE suite = ?", (name,)
+        ).fetchone()[0]
+        version = max(row[0] if row else 0, last or 0) + 1
+        conn.execute(
+            "INSERT INTO snapshots (suite, version, created_at, content_hash, total_tests, body) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (name, version, time.time(), digest, len(suite), json.dumps(suite)),
+        )
+        conn.execute(
+            "INSERT INTO suites (name, version) VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET version = excluded.version",
+            (name, version),
+        )
+        return version
+
+    def _export(self, conn: sqlite3.Connection, name: str):
+        """Write the suite's JSON file while the write lock is held, so exports stay ordered."""
+        rows = conn.execute(
+            "SELECT body FROM tests WHERE suite = ? ORDER BY position", (name,)
+        ).fetchall()
+        path = self._json_path(name)
+        _atomic_write_json(path, [json.loads(r[0]) for r in rows])
+        conn.execute("UPDATE suites SET source_hash = ? WHERE name = ?", (_file_hash(path), name))
+
+    def _sync_from_json(self, name: str):
+        """Import the JSON file if it is new or was changed outside the store."""
+        path = self._json_path(name)
+        if not path.exists():
+            return
+        digest = _file_hash(path)
+        with self._connect() as conn:
+            row = conn.execute("SELECT source_hash FROM suites WHERE name = ?", (name,)).fetchone()
+        if row and row[0] == digest:
+            return
+        with open(path) as f:
+            suite = json.load(f)
+        with self._transaction() as conn:
+            row = conn.execute("SELECT source_hash FROM suites WHERE name = ?", (name,)).fetchone()
+            if row and row[0] == digest:
+                return
+            self._replace_tests(conn, name, suite)
+            conn.execute("UPDATE suites SET source_hash = ? WHERE name = ?", (digest, name))
+
+
+def _atomic_write_json(path: Path, data):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.stem}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
@@ -0,0 +1,174 @@
+"""Select sub-suites: filters by category/level/id/type and stratified sampling."""
+
+import fnmatch
+import random
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+
+def filter_suite(
+    suite: List[Dict],
+    categories: Optional[Iterable[str]] = None,
+    levels: Optional[Iterable[int]] = None,
+    test_ids: Optional[Iterable[str]] = None,
+    types: Optional[Iterable[str]] = None,
+) -> List[Dict]:
+    """Keep tests matching every given filter. ``test_ids`` are glob patterns."""
+    categories = set(categories) if categories else None
+    levels = {int(l) for l in levels} if levels else None
+    patterns = list(test_ids) if test_ids else None
+    types = set(types) if types else None
+
+    selected = []
+    for test in suite:
+        if categories and test["category"] not in categories:
+            continue
+        if levels and test["level"] not in levels:
+            continue
+        if types and test.get("type", "generate") not in types:
+            continue
+        if patterns and not any(fnmatch.fnmatchcase(test["id"], p) for p in patterns):
+            continue
+        selected.append(test)
+    return selected
+
+
+def resolve_sample_size(sample: Union[int, float, str], total: int) -> int:
+    """Turn a sample spec (count, fraction in (0, 1], or "10%") into a test count.
+
+    Whole-number floats above 1 (JSON ``20.0``) are counts.
+    """
+    if isinstance(sample, str):
+        sample = sample.strip()
+        if sample.endswith("%"):
+            percent = float(sample[:-1])
+            if not 0 < percent <= 100:
+                raise ValueError(f"Sample percentage must be in (0, 100], got {sample}")
+            return max(1, round(total * percent / 100))
+        elif "." in sample:
+            sample = float(sample)
+        else:
+            sample = int(sample)
+    if isinstance(sample, float) and sample > 1 and sample.is_integer():
+        sample = int(sample)
+    if isinstance(sample, float):
+        if not 0 < sample <= 1:
+            raise ValueError(
+                f"Sample must be a whole test count, a fraction in (0, 1] or a percentage, got {sample}"
+            )
+        return max(1, round(total * sample))
+    if sample < 1:
+        raise ValueError(f"Sample size must be positive, got {sample}")
+    return min(sample, total)
+
+
+def _stratum(test: Dict) -> Tuple[str, int]:
+    return test["category"], test["level"]
+
+
+def stratified_sample(suite: List[Dict], k: int, seed: int = 0) -> List[Dict]:
+    """Pick k tests proportionally across category x level strata.
+
+    Each stratum first gets the floor of its proportional share. Leftover
+    slots go one at a time to the stratum with the largest rounding
+    remainder plus the shortfall of its category and level totals, so the
+    per-category and per-level mixes stay close to the full suite even when
+    most strata are smaller than one slot. The result keeps suite order.
+    """
+    if k >= len(suite):
+        return list(suite)
+
+    strata: Dict[Tuple[str, int], List[int]] = {}
+    for idx, test in enumerate(suite):
+        strata.setdefault(_stratum(test), []).append(idx)
+
+    ratio = k / len(suite)
+    keys = sorted(strata)
+    exact = {key: len(strata[key]) * ratio for key in keys}
+    quotas = {key: int(exact[key]) for key in keys}
+
+    cat_target: Dict[str, float] = {}
+    lvl_target: Dict[int, float] = {}
+    for (cat, lvl), share in exact.items():
+        cat_target[cat] = cat_target.get(cat, 0) + share
+        lvl_target[lvl] = lvl_target.get(lvl, 0) + share
+
+    def shortfall(key: Tuple[str, int]) -> float:
+        cat, lvl = key
+        cat_have = sum(q for (c, _), q in quotas.items() if c == cat)
+        lvl_have = sum(q for (_, l), q in quotas.items() if l == lvl)
+        return (exact[key] - quotas[key]) + (cat_target[cat] - cat_have) + (lvl_target[lvl] - lvl_have)
+
+    for _ in range(k - sum(quotas.values())):
+        open_keys = [key for key in keys if quotas[key] < len(strata[key])]
+        best = max(open_keys, key=shortfall)
+        quotas[best] += 1
+
+    rng = random.Random(seed)
+    chosen = []
+    for key in keys:
+        chosen.extend(rng.sample(strata[key], quotas[key]))
+    return [suite[idx] for idx in sorted(chosen)]
+
+
+def select_tests(
+    suite: List[Dict],
+    categories: Optional[Iterable[str]] = None,
+    levels: Optional[Iterable[int]] = None,
+    test_ids: Optional[Iterable[str]] = None,
+    types: Optional[Iterable[str]] = None,
+    sample: Optional[Union[int, float, str]] = None,
+    seed: int = 0,
+) -> List[Dict]:
+    """Apply filters, then an optional stratified sample. Raises ValueError if nothing matches."""
+    selected = filter_suite(suite, categories, levels, test_ids, types)
+    if not selected:
+        raise ValueError("No tests match the selection")
+    if sample:
+        selected = stratified_sample(selected, resolve_sample_size(sample, len(selected)), seed)
+    return selected
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    """Parse "i/N" (1 <= i <= N) into (i, N)."""
+    try:
+        index, count = (int(part) for part in spec.split("/"))
+    except ValueError:
+        raise ValueError(f"Shard must look like i/N, got {spec!r}") from None
+    if not 1 <= index <= count:
+        raise ValueError(f"Shard index must be between 1 and {count}, got {index}")
+    return index, count
+
+
+def shard_tests(suite: List[Dict], index: int, count: int) -> List[Dict]:
+    """Deterministic shard ``index`` of ``count`` (1-based), stratified by category x level.
+
+    Strata are dealt in sorted order, each test going to the shard with the
+    fewest tests of its stratum, then of its level, then of its category,
+    then overall. Every stratum is split evenly (within one test), and the
+    level, category and total counts stay close between shards. The result
+    keeps suite order.
+    """
+    strata: Dict[Tuple[str, int], List[int]] = {}
+    for idx, test in enumerate(suite):
+        strata.setdefault(_stratum(test), []).append(idx)
+
+    totals = [0] * count
+    per_level: Dict[int, List[int]] = {}
+    per_category: Dict[str, List[int]] = {}
+    chosen = []
+    for (cat, lvl) in sorted(strata):
+        in_stratum = [0] * count
+        by_level = per_level.setdefault(lvl, [0] * count)
+        by_category = per_category.setdefault(cat, [0] * count)
+        for idx in strata[(cat, lvl)]:
+            shard = min(
+                range(count),
+                key=lambda s: (in_stratum[s], by_level[s], by_category[s], totals[s], s),
+            )
+            in_stratum[shard] += 1
+            by_level[shard] += 1
+            by_category[shard] += 1
+            totals[shard] += 1
+            if shard == index - 1:
+                chosen.append(idx)
+    return [suite[idx] for idx in sorted(chosen)]
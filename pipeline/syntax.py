@@ -1,7 +1,8 @@
 """Jac syntax validation utilities."""
 
 import re
-from typing import Tuple
+from functools import lru_cache
+from typing import Callable, Tuple
 
 
 def patch_missing_braces(code: str) -> Tuple[str, bool]:
@@ -51,38 +52,60 @@ STRICT_PATTERNS = {
 }
 
 
-def validate_element(code: str, element: str) -> bool:
-    """Check if a required element appears in proper syntactic context."""
-    if element in STRICT_PATTERNS:
-        return bool(re.search(STRICT_PATTERNS[element], code))
+_STRICT_REGEXES = {element: re.compile(pattern) for element, pattern in STRICT_PATTERNS.items()}
+
+_OPERATORS = {'==', '!=', '<=', '>=', '+=', '-=', '*=', '/=', '**', '//',
+              '<<', '>>', '&', '|', '^', '~', 'and', 'or', 'not', 'in', 'is'}
+
 
-    if ':' in element and 'has' not in code:
-        return False
+def _search(pattern: str) -> Callable[[str], bool]:
+    regex = re.compile(pattern)
+    return lambda code: regex.search(code) is not None
 
-    if element.startswith('def ') and 'def' in code:
-        parts = element.split()
-        if len(parts) > 1:
-            return bool(re.search(rf'\bdef\s+{re.escape(parts[1])}\s*\([^)]*\)', code))
 
+def _compile_plain(element: str) -> Callable[[str], bool]:
     for keyword in ['walker', 'node', 'edge', 'obj', 'enum']:
         if element.startswith(keyword + ' '):
             parts = element.split()
             if len(parts) > 1:
-                return bool(re.search(rf'\b{keyword}\s+{re.escape(parts[1])}\s*\{{', code))
+                return _search(rf'\b{keyword}\s+{re.escape(parts[1])}\s*\{{')
 
     if '.' in element and '(' not in element:
-        if re.search(re.escape(element) + r'\s*\(', code):
-            return True
-        return False
+        return _search(re.escape(element) + r'\s*\(')
 
-    if element.startswith('"') or element.startswith("'"):
-        return element in code
-
-    if element in ['==', '!=', '<=', '>=', '+=', '-=', '*=', '/=', '**', '//',
-                   '<<', '>>', '&', '|', '^', '~', 'and', 'or', 'not', 'in', 'is']:
-        return element in code
+    if element.startswith('"') or element.startswith("'") or element in _OPERATORS:
+        return lambda code: element in code
 
     if element.replace('_', '').isalnum():
-        return bool(re.search(rf'\b{re.escape(element)}\b', code))
+        return _search(rf'\b{re.escape(element)}\b')
+
+    return lambda code: element in code
+
 
-    return element in code
+@lru_cache(maxsize=4096)
+def compile_element(element: str) -> Callable[[str], bool]:
+    """Build a matcher for one required element; the rules depend only on the element."""
+    if element in _STRICT_REGEXES:
+        regex = _STRICT_REGEXES[element]
+        return lambda code: regex.search(code) is not None
+
+    match = _compile_plain(element)
+    parts = element.split()
+    if element.startswith('def ') and len(parts) > 1:
+        def_regex = re.compile(rf'\bdef\s+{re.escape(parts[1])}\s*\([^)]*\)')
+        plain = match
+
+        def match(code: str) -> bool:
+            if 'def' in code:
+                return def_regex.search(code) is not None
+            return plain(code)
+
+    if ':' in element:
+        inner = match
+        return lambda code: 'has' in code and inner(code)
+    return match
+
+
+def validate_element(code: str, element: str) -> bool:
+    """Check if a required element appears in proper syntactic context."""
+    return compile_element(element)(code)
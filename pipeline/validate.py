@@ -1,12 +1,15 @@
 """Validate test suite definitions against the current jac version."""
 
-import json
 import os
 import subprocess
 import sys
 import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, Generator, List, Optional
+
+from .profiling import follow
+from .store import SuiteStore
 
 DEPRECATED_PATTERNS = {
     ":g:": "Removed in 0.8.4 -- use `global` keyword",
@@ -25,19 +28,25 @@ SUSPICIOUS_IN_REQUIRED = {
 
 SUITES_DIR = Path(__file__).parent.parent / "suites"
 
+_store: Optional[SuiteStore] = None
+
+
+def get_store() -> SuiteStore:
+    global _store
+    if _store is None:
+        _store = SuiteStore(SUITES_DIR)
+    return _store
+
 
-def load_suite(name: str) -> List[Dict]:
-    path = SUITES_DIR / f"{name}.json"
-    if not path.exists():
-        raise FileNotFoundError(f"Suite not found: {path}")
-    with open(path) as f:
-        return json.load(f)
+def load_suite(name: str, version: Optional[int] = None) -> List[Dict]:
+    """Load a suite's current tests, or the snapshot pinned by ``version``."""
+    return get_store().load(name, version)
 
 
 def list_suites() -> List[str]:
     if not SUITES_DIR.exists():
         return []
-    return [p.stem for p in sorted(SUITES_DIR.glob("*.json"))]
+    return get_store().list_suites()
 
 
 def _jac_check(code: str) -> tuple[bool, str]:
@@ -57,51 +66,82 @@ def _jac_check(code: str) -> tuple[bool, str]:
         os.unlink(path)
 
 
-def validate_suite(suite: List[Dict]) -> Dict:
-    """Validate a test suite. Returns {"valid": bool, "issues": [...], "warnings": [...]}."""
+def _static_issues(t: Dict, tid: str, required_fields: set, duplicate: bool) -> List[str]:
     issues = []
-    warnings = []
+    missing = required_fields - set(t.keys())
+    if missing:
+        issues.append(f"{tid}: missing fields {missing}")
+
+    if duplicate:
+        issues.append(f"Duplicate test ID: {tid}")
+
+    if not isinstance(t.get("required_elements", []), list):
+        issues.append(f"{tid}: required_elements must be a list")
+
+    all_patterns = {**DEPRECATED_PATTERNS, **SUSPICIOUS_IN_REQUIRED}
+    for elem in t.get("required_elements", []):
+        for pattern, desc in all_patterns.items():
+            if pattern in elem:
+                issues.append(f"{tid}: required_element '{elem}' -- {desc}")
+
+    for field in ["task", "broken_code", "partial_code", "test_harness"]:
+        val = t.get(field, "")
+        if val:
+            for pattern, desc in DEPRECATED_PATTERNS.items():
+                if pattern in val:
+                    issues.append(f"{tid}: {field} contains '{pattern}' -- {desc}")
+    return issues
+
+
+def _jac_issues(t: Dict, tid: str) -> tuple[List[str], List[str]]:
+    """Checks that shell out to jac. Returns (issues, warnings)."""
+    issues, warnings = [], []
+    if t.get("test_harness"):
+        ok, err = _jac_check(t["test_harness"])
+        if not ok:
+            issues.append(f"{tid}: test_harness fails jac check -- {err}")
+
+    if t.get("broken_code"):
+        ok, _ = _jac_check(t["broken_code"])
+        if ok:
+            warnings.append(f"{tid}: broken_code compiles (bug may be behavioral)")
+    return issues, warnings
+
+
+def validate_suite_streaming(suite: List[Dict], workers: Optional[int] = None) -> Generator[Dict, None, None]:
+    """Validate a suite with the jac checks spread over a thread pool.
+
+    Yields a ``test`` event ({test_id, index, done, total, issues, warnings})
+    as each test finishes, then a ``report`` event with the same fields as
+    ``validate_suite``; issues and warnings in the report are in suite order.
+    """
     required_fields = {"id", "level", "category", "task", "required_elements", "points"}
-
     ids_seen = set()
+    static = []
     for i, t in enumerate(suite):
         tid = t.get("id", f"index_{i}")
-
-        missing = required_fields - set(t.keys())
-        if missing:
-            issues.append(f"{tid}: missing fields {missing}")
-
-        if tid in ids_seen:
-            issues.append(f"Duplicate test ID: {tid}")
+        static.append((tid, _static_issues(t, tid, required_fields, tid in ids_seen)))
         ids_seen.add(tid)
 
-        if not isinstance(t.get("required_elements", []), list):
-            issues.append(f"{tid}: required_elements must be a list")
-
-        all_patterns = {**DEPRECATED_PATTERNS, **SUSPICIOUS_IN_REQUIRED}
-        for elem in t.get("required_elements", []):
-            for pattern, desc in all_patterns.items():
-                if pattern in elem:
-                    issues.append(f"{tid}: required_element '{elem}' -- {desc}")
-
-        for field in ["task", "broken_code", "partial_code", "test_harness"]:
-            val = t.get(field, "")
-            if val:
-                for pattern, desc in DEPRECATED_PATTERNS.items():
-                    if pattern in val:
-                        issues.append(f"{tid}: {field} contains '{pattern}' -- {desc}")
-
-        if t.get("test_harness"):
-            ok, err = _jac_check(t["test_harness"])
-            if not ok:
-                issues.append(f"{tid}: test_harness fails jac check -- {err}")
-
-        if t.get("broken_code"):
-            ok, _ = _jac_check(t["broken_code"])
-            if ok:
-                warnings.append(f"{tid}: broken_code compiles (bug may be behavioral)")
-
-    return {
+    per_test: List[Optional[tuple]] = [None] * len(suite)
+    with ThreadPoolExecutor(max_workers=workers or os.cpu_count() or 4) as pool:
+        futures = {
+            pool.submit(follow(_jac_issues), t, static[i][0]): i for i, t in enumerate(suite)
+        }
+        for done, future in enumerate(as_completed(futures), 1):
+            i = futures[future]
+            tid, issues = static[i]
+            jac_issues, warnings = future.result()
+            per_test[i] = (issues + jac_issues, warnings)
+            yield {
+                "type": "test", "test_id": tid, "index": i, "done": done, "total": len(suite),
+                "issues": per_test[i][0], "warnings": warnings,
+            }
+
+    issues = [issue for test_issues, _ in per_test for issue in test_issues]
+    warnings = [warning for _, test_warnings in per_test for warning in test_warnings]
+    yield {
+        "type": "report",
         "valid": len(issues) == 0,
         "issues": issues,
         "warnings": warnings,
@@ -110,6 +150,13 @@ def validate_suite(suite: List[Dict]) -> Dict:
     }
 
 
+def validate_suite(suite: List[Dict]) -> Dict:
+    """Validate a test suite. Returns {"valid": bool, "issues": [...], "warnings": [...]}."""
+    for event in validate_suite_streaming(suite):
+        if event["type"] == "report":
+            return {k: v for k, v in event.items() if k != "type"}
+
+
 if __name__ == "__main__":
     suite_name = sys.argv[1] if len(sys.argv) > 1 else "standard"
     suite = load_suite(suite_name)
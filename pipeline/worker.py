@@ -0,0 +1,122 @@
+"""Evaluation worker: pull (code, test_case) jobs from the server and evaluate them.
+
+    python -m pipeline.worker --server http://localhost:5000 --token <admin token>
+
+Run as many workers as you like, on one machine or several. Each worker
+leases jobs over HTTP, runs ``Evaluator.evaluate_single`` and posts results
+back; if a worker dies, the server reassigns its jobs.
+"""
+
+import argparse
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+
+from .evaluator import Evaluator
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    def __init__(self, server: str, token: str, concurrency: int, worker_id: str):
+        import requests
+
+        self.server = server.rstrip("/")
+        self.worker_id = worker_id
+        self.concurrency = concurrency
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {token}"
+        self.evaluator = Evaluator()
+        self.stop = threading.Event()
+
+    def _post(self, path: str, payload: dict, timeout: float = 30) -> dict:
+        response = self.session.post(f"{self.server}/api/workers/{path}", json=payload, timeout=timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def register(self):
+        self._post("register", {
+            "worker_id": self.worker_id,
+            "host": socket.gethostname(),
+            "concurrency": self.concurrency,
+        })
+        logger.info(f"Registered as {self.worker_id} with {self.server}")
+
+    def _heartbeat_loop(self):
+        while not self.stop.wait(5):
+            try:
+                if not self._post("heartbeat", {"worker_id": self.worker_id}).get("known", True):
+                    self.register()
+            except Exception as exc:
+                logger.warning(f"Heartbeat failed: {exc}")
+
+    def _job_loop(self):
+        while not self.stop.is_set():
+            try:
+                leased = self._post("lease", {"worker_id": self.worker_id, "max_jobs": 1, "wait": 20}, timeout=40)
+            except Exception as exc:
+                logger.warning(f"Lease failed: {exc}")
+                time.sleep(2)
+                continue
+            if leased.get("reregister"):
+                self.register()
+                continue
+            for job in leased.get("jobs", []):
+                self._run_job(job)
+
+    def _run_job(self, job: dict):
+        payload = {"worker_id": self.worker_id, "job_id": job["job_id"]}
+        try:
+            payload["result"] = self.evaluator.evaluate_single(
+                job["code"], job["test_case"], timeouts=job.get("timeouts")
+            )
+        except Exception as exc:
+            payload["error"] = str(exc)
+        try:
+            self._post("complete", payload)
+        except Exception as exc:
+            logger.warning(f"Could not report {job['job_id']}: {exc}")
+
+    def run(self):
+        while True:
+            try:
+                self.register()
+                break
+            except Exception as exc:
+                logger.warning(f"Register failed ({exc}); retrying")
+                time.sleep(2)
+        threads = [threading.Thread(target=self._heartbeat_loop, daemon=True)]
+        threads += [threading.Thread(target=self._job_loop, daemon=True) for _ in range(self.concurrency)]
+        for t in threads:
+            t.start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            self.stop.set()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Jac DocBench evaluation worker")
+    parser.add_argument("--server", default=os.getenv("DOCBENCH_SERVER", "http://localhost:5000"))
+    parser.add_argument("--token", default=os.getenv("DOCBENCH_TOKEN"), help="Admin token")
+    parser.add_argument("--concurrency", "-j", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--worker-id", default=f"{socket.gethostname()}-{uuid.uuid4().hex[:8]}")
+    parser.add_argument("--verbose", "-v", action="store_true")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.DEBUG if args.verbose else logging.INFO,
+        format="%(levelname)s: %(message)s",
+    )
+    if not args.token:
+        parser.error("--token (or DOCBENCH_TOKEN) is required")
+
+    Worker(args.server, args.token, args.concurrency, args.worker_id).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,12 @@
 """Admin API routes for managing test suites."""
 
-import json
-from pathlib import Path
-
 from starlette.requests import Request
-from starlette.responses import JSONResponse
+from starlette.responses import FileResponse, JSONResponse
 from starlette.routing import Route
 
-from pipeline.validate import load_suite, validate_suite, list_suites, SUITES_DIR
+from pipeline.clients import get_client_pool
+from pipeline.profiling import PROFILES_DIR
+from pipeline.validate import load_suite, list_suites, get_store
 from .auth import check_admin
 
 
@@ -36,11 +35,10 @@ async def admin_create_suite(request: Request):
         return JSONResponse(
             {"error": "Body must be a JSON array of test definitions"}, status_code=400
         )
-    SUITES_DIR.mkdir(parents=True, exist_ok=True)
-    path = SUITES_DIR / f"{name}.json"
-    with open(path, "w") as f:
-        json.dump(data, f, indent=2)
-    return JSONResponse({"status": "created", "name": name, "total_tests": len(data)})
+    if any(not isinstance(t, dict) or not t.get("id") for t in data):
+        return JSONResponse({"error": "Every test definition needs an 'id'"}, status_code=400)
+    version = get_store().replace(name, data)
+    return JSONResponse({"status": "created", "name": name, "total_tests": len(data), "version": version})
 
 
 async def admin_delete_suite(request: Request):
@@ -50,65 +48,65 @@ async def admin_delete_suite(request: Request):
     name = request.path_params["name"]
     if name == "standard":
         return JSONResponse({"error": "Cannot delete the standard suite"}, status_code=400)
-    path = SUITES_DIR / f"{name}.json"
-    if not path.exists():
+    if not get_store().delete(name):
         return JSONResponse({"error": f"Suite '{name}' not found"}, status_code=404)
-    path.unlink()
     return JSONResponse({"status": "deleted", "name": name})
 
 
-async def admin_validate_suite(request: Request):
+async def admin_update_tests(request: Request):
     admin_name, error = check_admin(request)
     if error:
         return error
     name = request.path_params["name"]
+    updates = await request.json()
+    if not updates or not isinstance(updates, list):
+        return JSONResponse(
+            {"error": "Body must be a JSON array of test definitions"}, status_code=400
+        )
     try:
-        suite = load_suite(name)
+        result = get_store().upsert_tests(name, updates)
     except FileNotFoundError:
         return JSONResponse({"error": f"Suite '{name}' not found"}, status_code=404)
-    result = validate_suite(suite)
-    return JSONResponse(result)
+    return JSONResponse({"status": "updated", **result})
 
 
-async def admin_update_tests(request: Request):
+async def admin_list_versions(request: Request):
     admin_name, error = check_admin(request)
     if error:
         return error
     name = request.path_params["name"]
-    updates = await request.json()
-    if not updates or not isinstance(updates, list):
-        return JSONResponse(
-            {"error": "Body must be a JSON array of test definitions"}, status_code=400
-        )
-    try:
-        suite = load_suite(name)
-    except FileNotFoundError:
+    versions = get_store().list_versions(name)
+    if not versions:
         return JSONResponse({"error": f"Suite '{name}' not found"}, status_code=404)
+    return JSONResponse(versions)
 
-    suite_by_id = {t["id"]: t for t in suite}
-    added, updated = 0, 0
-    for test in updates:
-        tid = test.get("id")
-        if not tid:
-            continue
-        if tid in suite_by_id:
-            suite_by_id[tid] = test
-            updated += 1
-        else:
-            suite_by_id[tid] = test
-            added += 1
-
-    new_suite = list(suite_by_id.values())
-    path = SUITES_DIR / f"{name}.json"
-    with open(path, "w") as f:
-        json.dump(new_suite, f, indent=2)
-    return JSONResponse({"status": "updated", "added": added, "updated": updated, "total": len(new_suite)})
+
+async def admin_llm_clients(request: Request):
+    admin_name, error = check_admin(request)
+    if error:
+        return error
+    return JSONResponse(get_client_pool().stats())
+
+
+async def admin_get_profile(request: Request):
+    """Download a report of a profiled run (``<run>.samples.txt``, ``<run>.folded``, ``<run>.memory.txt``...)."""
+    admin_name, error = check_admin(request)
+    if error:
+        return error
+    filename = request.path_params["filename"]
+    path = PROFILES_DIR / filename
+    reports = (".pstats", ".samples.txt", ".folded", ".memory.txt")
+    if path.name != filename or not filename.endswith(reports) or not path.is_file():
+        return JSONResponse({"error": f"Profile '{filename}' not found"}, status_code=404)
+    return FileResponse(path, filename=filename)
 
 
 admin_routes = [
     Route("/api/admin/suites", admin_list_suites, methods=["GET"]),
     Route("/api/admin/suites/{name}", admin_create_suite, methods=["POST"]),
     Route("/api/admin/suites/{name}", admin_delete_suite, methods=["DELETE"]),
-    Route("/api/admin/suites/{name}/validate", admin_validate_suite, methods=["POST"]),
     Route("/api/admin/suites/{name}/tests", admin_update_tests, methods=["PUT"]),
+    Route("/api/admin/suites/{name}/versions", admin_list_versions, methods=["GET"]),
+    Route("/api/admin/llm-clients", admin_llm_clients, methods=["GET"]),
+    Route("/api/admin/profiles/{filename}", admin_get_profile, methods=["GET"]),
 ]
@@ -0,0 +1,64 @@
+"""Cross-run analytics over the columnar score matrix."""
+
+import threading
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+_lock = threading.Lock()
+_cache = {"key": None, "view": None}
+
+
+def _matrix():
+    from pipeline.matrix import ScoreMatrix
+
+    return ScoreMatrix()
+
+
+def record_result(results: dict):
+    """Append a finished run to the score matrix. Called off the event loop."""
+    _matrix().record(results)
+
+
+def _include_partial(request: Request) -> bool:
+    return request.query_params.get("include_partial") in ("1", "true")
+
+
+def _view():
+    """Matrix view, rebuilt only when runs.jsonl has changed."""
+    matrix = _matrix()
+    runs_path = matrix.root / "runs.jsonl"
+    key = runs_path.stat().st_mtime_ns if runs_path.exists() else None
+    with _lock:
+        if _cache["view"] is None or _cache["key"] != key:
+            _cache["view"] = matrix.load()
+            _cache["key"] = key
+        return _cache["view"]
+
+
+async def analytics_tests(request: Request):
+    params = request.query_params
+    return JSONResponse(_view().test_stats(
+        model=params.get("model"), suite=params.get("suite"), include_partial=_include_partial(request),
+    ))
+
+
+async def analytics_categories(request: Request):
+    params = request.query_params
+    return JSONResponse(_view().category_stats(
+        model=params.get("model"), suite=params.get("suite"), include_partial=_include_partial(request),
+    ))
+
+
+async def analytics_models(request: Request):
+    return JSONResponse(_view().model_ranking(
+        suite=request.query_params.get("suite"), include_partial=_include_partial(request),
+    ))
+
+
+analytics_routes = [
+    Route("/api/analytics/tests", analytics_tests, methods=["GET"]),
+    Route("/api/analytics/categories", analytics_categories, methods=["GET"]),
+    Route("/api/analytics/models", analytics_models, methods=["GET"]),
+]
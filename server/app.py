@@ -7,30 +7,32 @@ from pathlib import Path
 from starlette.applications import Starlette
 from starlette.middleware import Middleware
 from starlette.middleware.cors import CORSMiddleware
-from starlette.responses import FileResponse
-from starlette.routing import Route, Mount
-from starlette.staticfiles import StaticFiles
+from starlette.routing import Route
+
+from pipeline.run import set_evaluation_backend, set_llm_slots
 
 from .routes import public_routes
 from .admin import admin_routes
+from .analytics import analytics_routes
+from .scheduler import llm_slots, scheduler_routes
+from .static import FrontendFiles
+from .validation import validation_routes
+from .workers import coordinator, worker_routes
 
 FRONTEND_DIR = Path(__file__).parent.parent / "web" / "dist"
 
 
 def create_app() -> Starlette:
-    routes = [*public_routes, *admin_routes]
+    routes = [
+        *public_routes, *admin_routes, *validation_routes, *analytics_routes, *worker_routes,
+        *scheduler_routes,
+    ]
+    set_evaluation_backend(coordinator)
+    set_llm_slots(llm_slots)
 
     if FRONTEND_DIR.exists():
-        routes.append(Mount("/assets", StaticFiles(directory=FRONTEND_DIR / "assets"), name="assets"))
-
-        async def serve_frontend(request):
-            path = request.path_params.get("path", "")
-            file_path = FRONTEND_DIR / path
-            if path and file_path.is_file():
-                return FileResponse(file_path)
-            return FileResponse(FRONTEND_DIR / "index.html")
-
-        routes.append(Route("/{path:path}", serve_frontend))
+        frontend = FrontendFiles(FRONTEND_DIR)
+        routes.append(Route("/{path:path}", frontend.serve, methods=["GET", "HEAD"]))
 
     middleware = [
         Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
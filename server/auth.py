@@ -8,6 +8,9 @@ from starlette.requests import Request
 from starlette.responses import JSONResponse
 
 CONFIG_PATH = Path(__file__).parent.parent / "config.json"
+# config.json may be read-only (a single-file bind mount in docker-compose),
+# so weights set at runtime live under results/.
+WEIGHTS_PATH = Path(__file__).parent.parent / "results" / "scheduler_weights.json"
 
 
 def _load_config() -> dict:
@@ -46,3 +49,24 @@ def check_admin(request: Request) -> tuple[Optional[str], Optional[JSONResponse]
     if not admin_name:
         return None, JSONResponse({"error": "Invalid admin token"}, status_code=403)
     return admin_name, None
+
+
+def get_scheduler_config() -> dict:
+    """LLM slot count and per-tenant weights (tenant = API key id) for fair sharing.
+
+    Weights saved through the admin API replace those in config.json.
+    """
+    config = _load_config()
+    scheduler = {"llm_slots": 20, "weights": {}, **config.get("scheduler", {})}
+    if WEIGHTS_PATH.exists():
+        with open(WEIGHTS_PATH) as f:
+            scheduler["weights"] = json.load(f)
+    return scheduler
+
+
+def save_scheduler_weights(weights: dict):
+    """Persist weights to ``WEIGHTS_PATH``. Raises OSError if it cannot be written."""
+    WEIGHTS_PATH.parent.mkdir(parents=True, exist_ok=True)
+    tmp = WEIGHTS_PATH.with_name(WEIGHTS_PATH.name + ".tmp")
+    tmp.write_text(json.dumps(weights, indent=2) + "\n")
+    tmp.replace(WEIGHTS_PATH)
@@ -4,28 +4,114 @@ import asyncio
 import json
 import logging
 import os
-from typing import AsyncGenerator
+import threading
+import time
+from contextlib import aclosing, suppress
+from typing import AsyncGenerator, Optional
 
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 from starlette.routing import Route
 
+from pipeline.budget import LIMIT_FIELDS
+from pipeline.clients import get_client_pool
+from pipeline.profiling import RunProfiler
 from pipeline.run import run_benchmark_streaming, fetch_docs
-from pipeline.validate import list_suites, load_suite
+from pipeline.scheduling import key_id
+from pipeline.validate import get_store, list_suites, load_suite
+from .analytics import record_result
+from .auth import check_admin, get_defaults
+from .singleflight import SingleFlight, run_key
 
 logger = logging.getLogger(__name__)
 
 ALLOWED_DOC_EXTENSIONS = {".txt", ".md"}
 MAX_DOC_SIZE = 5 * 1024 * 1024
 
+SELECTION_LIST_FIELDS = ("categories", "levels", "test_ids", "types")
+BUDGET_PRICE_FIELDS = ("input_price", "output_price", "prices")
+
+# Identical concurrent runs share one pipeline execution.
+inflight_runs = SingleFlight()
+
+
+def _parse_selection(data) -> dict:
+    """Sub-suite filters from a JSON body or form. Form lists are comma-separated."""
+    selection = {}
+    for field in SELECTION_LIST_FIELDS:
+        value = data.get(field)
+        if isinstance(value, str):
+            value = [v.strip() for v in value.split(",") if v.strip()]
+        if value:
+            selection[field] = [int(v) for v in value] if field == "levels" else list(value)
+    if data.get("sample"):
+        selection["sample"] = data.get("sample")
+    if selection:
+        selection["seed"] = int(data.get("seed", 0))
+    return selection
+
+
+def _parse_version(value) -> Optional[int]:
+    """A suite version from a query string, form field or JSON body; None if absent."""
+    if value is None or value == "":
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or value < 1:
+        raise ValueError(f"suite version must be a positive integer, got {value!r}")
+    return value
+
+
+def _loosened_budget_fields(defaults: dict, budget: dict) -> list:
+    """Fields of ``budget`` that would lift or loosen an admin default.
+
+    A limit may be lowered (or set where the default has none); any other
+    change to a field the admin set loosens the budget. Prices count as one
+    setting, since a top-level price overrides the per-model ones.
+    """
+    admin_prices = any(defaults.get(f) not in (None, {}) for f in BUDGET_PRICE_FIELDS)
+    loosened = []
+    for field, value in budget.items():
+        if field in BUDGET_PRICE_FIELDS:
+            if admin_prices and value != defaults.get(field):
+                loosened.append(field)
+            continue
+        default = defaults.get(field)
+        if default is None or value == default:
+            continue
+        tighter = (
+            field in LIMIT_FIELDS
+            and isinstance(value, (int, float)) and not isinstance(value, bool)
+            and value <= default
+        )
+        if not tighter:
+            loosened.append(field)
+    return loosened
+
 
 class SSEResponse:
-    """Server-Sent Events response."""
+    """Server-Sent Events response. The generator is closed when the client disconnects."""
 
     def __init__(self, generator: AsyncGenerator):
         self.generator = generator
 
     async def __call__(self, scope, receive, send):
+        stream = asyncio.create_task(self._stream(send))
+        disconnected = asyncio.create_task(self._wait_disconnect(receive))
+        done, _ = await asyncio.wait({stream, disconnected}, return_when=asyncio.FIRST_COMPLETED)
+        if stream in done:
+            disconnected.cancel()
+            stream.result()
+        else:
+            stream.cancel()
+            with suppress(asyncio.CancelledError):
+                await stream
+
+    async def _wait_disconnect(self, receive):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    async def _stream(self, send):
         await send({
             "type": "http.response.start",
             "status": 200,
@@ -55,10 +141,16 @@ async def api_run(request: Request):
         api_key = form.get("api_key")
         model = form.get("model")
         suite_name = form.get("suite", "standard")
+        suite_version = form.get("suite_version")
         doc_url = form.get("doc_url")
         max_tokens = int(form.get("max_tokens", 16000))
         batch_size = int(form.get("batch_size", 45))
         temperature = float(form.get("temperature", 0.1))
+        selection = _parse_selection(form)
+        adaptive = json.loads(form["adaptive"]) if form.get("adaptive") else None
+        samples = int(form.get("samples", 1))
+        budget = json.loads(form["budget"]) if form.get("budget") else {}
+        profile = form.get("profile") in ("1", "true")
 
         doc_content = None
         doc_file = form.get("doc_file")
@@ -78,31 +170,98 @@ async def api_run(request: Request):
         api_key = data.get("api_key")
         model = data.get("model")
         suite_name = data.get("suite", "standard")
+        suite_version = data.get("suite_version")
         doc_url = data.get("doc_url")
         doc_content = data.get("doc_content")
         max_tokens = data.get("max_tokens", 16000)
         batch_size = data.get("batch_size", 45)
         temperature = data.get("temperature", 0.1)
+        selection = _parse_selection(data)
+        adaptive = data.get("adaptive")
+        samples = int(data.get("samples", 1))
+        budget = data.get("budget") or {}
+        profile = bool(data.get("profile"))
 
     if not api_key:
         return JSONResponse({"error": "api_key is required"}, status_code=400)
+    try:
+        suite_version = _parse_version(suite_version)
+    except ValueError as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
     if not model:
         return JSONResponse({"error": "model is required"}, status_code=400)
+    if not isinstance(budget, dict):
+        return JSONResponse({"error": "budget must be an object"}, status_code=400)
+    if adaptive and not isinstance(adaptive, dict):
+        return JSONResponse({"error": "adaptive must be an object"}, status_code=400)
+    # Per-field overrides of the admin defaults. Anyone may tighten a limit;
+    # lifting one (an explicit null) or raising it takes an admin token.
+    default_budget = get_defaults().get("budget") or {}
+    loosened = _loosened_budget_fields(default_budget, budget)
+    if loosened:
+        admin_name, error = check_admin(request)
+        if error:
+            return JSONResponse(
+                {"error": f"Only admins can lift or raise the default budget ({', '.join(loosened)})"},
+                status_code=403,
+            )
+    budget = {**default_budget, **budget}
+    if profile:
+        admin_name, error = check_admin(request)
+        if error:
+            return error
+
+    tenant = key_id(api_key)
 
     async def event_stream() -> AsyncGenerator:
+        profiler = RunProfiler(time.strftime("run-%Y%m%d-%H%M%S"), sampled=True) if profile else None
+        events = None
+        # One pipeline step at a time, so closing waits for a step still running in its thread.
+        step = threading.Lock()
+
+        def advance():
+            with step:
+                return next(events, None)
+
+        def close():
+            with step:
+                events.close()
+
         try:
-            for event in run_benchmark_streaming(
+            events = run_benchmark_streaming(
                 api_key=api_key,
                 model=model,
                 suite_name=suite_name,
+                suite_version=suite_version,
                 doc_url=doc_url,
                 doc_content=doc_content,
                 max_tokens=max_tokens,
                 batch_size=batch_size,
                 temperature=temperature,
-            ):
+                selection=selection or None,
+                adaptive=adaptive or None,
+                samples=samples,
+                budget=budget,
+                tenant=tenant,
+            )
+            if profiler:
+                events = profiler.wrap(events)
+            # Advance the blocking pipeline in a worker thread so the event loop
+            # keeps serving other requests (including evaluation workers).
+            while True:
+                event = await asyncio.to_thread(advance)
+                if event is None:
+                    break
+                if event["type"] == "result":
+                    if profiler:
+                        profiler.mark("serialization")
+                    try:
+                        await asyncio.to_thread(record_result, event)
+                    except Exception as exc:
+                        logger.warning(f"Could not record run in score matrix: {exc}")
+                    if profiler:
+                        event.setdefault("meta", {})["profile"] = await asyncio.to_thread(profiler.stop)
                 yield event
-                await asyncio.sleep(0)
         except FileNotFoundError as exc:
             yield {"type": "error", "error": str(exc)}
         except ValueError as exc:
@@ -111,8 +270,53 @@ async def api_run(request: Request):
             yield {"type": "error", "error": str(exc)}
         except Exception as exc:
             yield {"type": "error", "error": f"Internal error: {exc}"}
+        finally:
+            # Closing the pipeline (also when the run is cancelled) stops its LLM batches.
+            if events is not None:
+                await asyncio.to_thread(close)
+            if profiler:
+                await asyncio.to_thread(profiler.stop)
 
-    return SSEResponse(event_stream())
+    # The API key is left out of the key: identical runs are shared across
+    # keys, and the starter's key pays for the run under its budget and fair
+    # share. A different key only attaches once OpenRouter has accepted it.
+    # The docs are keyed by the source the pipeline reads: doc_url wins over
+    # uploaded content.
+    key = run_key({
+        "model": model,
+        "suite": suite_name,
+        "suite_version": suite_version,
+        "doc_url": doc_url or None,
+        "max_tokens": max_tokens,
+        "batch_size": batch_size,
+        "temperature": temperature,
+        "selection": selection or None,
+        "adaptive": adaptive or None,
+        "samples": samples,
+        "budget": budget or None,
+        "profile": profile,
+    }, None if doc_url else doc_content)
+    shared = inflight_runs.get(key)
+    if shared is not None and shared.owner != tenant:
+        try:
+            accepted = await asyncio.to_thread(get_client_pool().verify, api_key)
+        except Exception as exc:
+            # Without a verdict the key can't ride on someone else's run: run it on its own.
+            logger.warning(f"Could not verify API key {tenant}, not sharing run {key[:12]}: {exc}")
+            key = run_key({"tenant": tenant, "key": key}, None)
+        else:
+            if not accepted:
+                return JSONResponse({"error": "Invalid API key"}, status_code=401)
+    run, started = inflight_runs.join(key, event_stream, owner=tenant)
+
+    async def follow() -> AsyncGenerator:
+        if not started:
+            yield {"type": "status", "stage": "attached", "run_key": key[:12], "replayed": len(run.events)}
+        async with aclosing(run.follow()) as events:
+            async for event in events:
+                yield event
+
+    return SSEResponse(follow())
 
 
 async def api_list_suites(request: Request):
@@ -122,9 +326,14 @@ async def api_list_suites(request: Request):
 async def api_get_suite(request: Request):
     name = request.path_params["name"]
     try:
-        suite = load_suite(name)
+        version = _parse_version(request.query_params.get("version"))
+    except ValueError as exc:
+        return JSONResponse({"error": str(exc)}, status_code=400)
+    try:
+        suite = load_suite(name, version)
         return JSONResponse({
             "name": name,
+            "version": version or get_store().current_version(name),
             "total_tests": len(suite),
             "total_points": sum(t.get("points", 0) for t in suite),
             "tests": suite,
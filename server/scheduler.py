@@ -0,0 +1,62 @@
+"""Fair sharing of LLM and evaluation capacity between tenants.
+
+A tenant is an API key, identified by ``key_id``. LLM requests from all
+runs share ``llm_slots`` concurrency slots. Evaluations share the
+coordinator's workers. Both are granted by weighted fair queuing, with
+weights (default 1) from ``config.json`` ``scheduler.weights``, or as last
+set through the admin API (``results/scheduler_weights.json``).
+"""
+
+import logging
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from pipeline.scheduling import FairSlots
+from .auth import check_admin, get_scheduler_config, save_scheduler_weights
+from .workers import coordinator
+
+logger = logging.getLogger(__name__)
+
+_config = get_scheduler_config()
+llm_slots = FairSlots(int(_config["llm_slots"]), _config["weights"])
+coordinator.set_weights(_config["weights"])
+
+
+async def admin_scheduler_status(request: Request):
+    admin_name, error = check_admin(request)
+    if error:
+        return error
+    queued = coordinator.status()
+    return JSONResponse({
+        "llm": llm_slots.stats(),
+        "eval": {"queued": queued["queued"], "queued_by_tenant": queued["queued_by_tenant"]},
+    })
+
+
+async def admin_set_weights(request: Request):
+    """Replace the tenant weights ({key_id: weight}); saved under results/."""
+    admin_name, error = check_admin(request)
+    if error:
+        return error
+    weights = await request.json()
+    if not isinstance(weights, dict) or not all(
+        isinstance(w, (int, float)) and not isinstance(w, bool) and w > 0 for w in weights.values()
+    ):
+        return JSONResponse({"error": "Body must map tenant ids to positive weights"}, status_code=400)
+    try:
+        save_scheduler_weights(weights)
+    except OSError as exc:
+        logger.error(f"Could not save scheduler weights: {exc}")
+        return JSONResponse({"error": f"Could not save weights: {exc}"}, status_code=500)
+    llm_slots.set_weights(weights)
+    coordinator.set_weights(weights)
+    logger.info(f"{admin_name} set scheduler weights: {weights}")
+    return JSONResponse({"status": "updated", "weights": weights})
+
+
+scheduler_routes = [
+    Route("/api/admin/scheduler", admin_scheduler_status, methods=["GET"]),
+    Route("/api/admin/scheduler/weights", admin_set_weights, methods=["PUT"]),
+]
@@ -0,0 +1,109 @@
+"""Single-flight coalescing of identical concurrent runs.
+
+The first request for a given run key starts the run in a background task
+that records every event; later requests with the same key attach to it,
+receive a replay of the events so far and then follow the live stream.
+A key is released when its run finishes, so later requests start fresh.
+A run whose followers have all disconnected is cancelled.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+from typing import AsyncGenerator, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def run_key(params: Dict, doc_content: Optional[str]) -> str:
+    """Canonical hash of run parameters plus the documentation content."""
+    canonical = dict(params)
+    canonical["doc_sha256"] = hashlib.sha256((doc_content or "").encode()).hexdigest()
+    data = json.dumps(canonical, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+class SharedRun:
+    """Append-only event log of one run with any number of followers."""
+
+    def __init__(self, key: str, owner: str = ""):
+        self.key = key
+        self.owner = owner
+        self.events: List[Dict] = []
+        self.done = False
+        self.followers = 0
+        self._changed = asyncio.Condition()
+        self.task: Optional[asyncio.Task] = None
+
+    async def publish(self, event: Dict):
+        async with self._changed:
+            self.events.append(event)
+            self._changed.notify_all()
+
+    async def finish(self):
+        async with self._changed:
+            self.done = True
+            self._changed.notify_all()
+
+    async def follow(self) -> AsyncGenerator[Dict, None]:
+        """Replay all events so far, then stream new ones until the run finishes.
+
+        When the last follower stops following an unfinished run, its task
+        is cancelled.
+        """
+        index = 0
+        self.followers += 1
+        try:
+            while True:
+                async with self._changed:
+                    while index >= len(self.events) and not self.done:
+                        await self._changed.wait()
+                    pending = self.events[index:]
+                    finished = self.done
+                for event in pending:
+                    yield event
+                index += len(pending)
+                if finished and index >= len(self.events):
+                    return
+        finally:
+            self.followers -= 1
+            if not self.followers and not self.done and self.task:
+                logger.info(f"Cancelling run {self.key[:12]}: no followers left")
+                self.task.cancel()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._runs: Dict[str, SharedRun] = {}
+
+    def get(self, key: str) -> Optional[SharedRun]:
+        return self._runs.get(key)
+
+    def join(
+        self, key: str, start: Callable[[], AsyncGenerator[Dict, None]], owner: str = "",
+    ) -> Tuple[SharedRun, bool]:
+        """Attach to the in-flight run for ``key`` or start one for ``owner``. Returns (run, started)."""
+        run = self._runs.get(key)
+        if run is not None:
+            logger.info(f"Coalesced run {key[:12]}")
+            return run, False
+        run = SharedRun(key, owner)
+        self._runs[key] = run
+        run.task = asyncio.create_task(self._pump(run, start()))
+        return run, True
+
+    async def _pump(self, run: SharedRun, events: AsyncGenerator[Dict, None]):
+        try:
+            async for event in events:
+                await run.publish(event)
+        except Exception as exc:
+            logger.error(f"Run {run.key[:12]} failed: {exc}")
+            await run.publish({"type": "error", "error": f"Internal error: {exc}"})
+        finally:
+            self._runs.pop(run.key, None)
+            await events.aclose()
+            await run.finish()
+
+    def inflight(self) -> int:
+        return len(self._runs)
@@ -0,0 +1,127 @@
+"""Frontend static files served from a startup-built in-memory index."""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+from typing import Dict, Optional
+
+from starlette.requests import Request
+from starlette.responses import FileResponse, Response
+
+COMPRESSIBLE_SUFFIXES = {".html", ".js", ".css", ".svg", ".json", ".txt", ".map", ".ico", ".xml"}
+MAX_IN_MEMORY = 2 * 1024 * 1024
+MIN_COMPRESS_SIZE = 1024
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+SHORT_CACHE = "public, max-age=3600"
+
+
+class StaticFile:
+    """One file with its encodings: {"identity"|"gzip"|"br": bytes or on-disk path}."""
+
+    def __init__(self, path: Path, cache_control: str):
+        self.path = path
+        self.cache_control = cache_control
+        self.media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        self.stat = path.stat()
+        self.in_memory = self.stat.st_size <= MAX_IN_MEMORY
+        self.variants: Dict[str, object] = {}
+
+        body = path.read_bytes() if self.in_memory else None
+        self.variants["identity"] = body if self.in_memory else path
+        self.etag = '"' + _digest(path, body) + '"'
+
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            variant = path.with_name(path.name + suffix)
+            if variant.is_file():
+                self.variants[encoding] = variant.read_bytes() if self.in_memory else variant
+        if (
+            "gzip" not in self.variants
+            and self.in_memory
+            and path.suffix in COMPRESSIBLE_SUFFIXES
+            and self.stat.st_size >= MIN_COMPRESS_SIZE
+        ):
+            self.variants["gzip"] = gzip.compress(body, compresslevel=9, mtime=0)
+
+    def response(self, request: Request) -> Response:
+        encoding = _choose_encoding(request.headers.get("accept-encoding", ""), self.variants)
+        etag = self.etag if encoding == "identity" else f'{self.etag[:-1]}-{encoding}"'
+        headers = {"cache-control": self.cache_control, "etag": etag, "vary": "Accept-Encoding"}
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+
+        if encoding != "identity":
+            headers["content-encoding"] = encoding
+        body = self.variants[encoding]
+        if isinstance(body, Path):
+            stat = self.stat if encoding == "identity" else None
+            return FileResponse(body, media_type=self.media_type, headers=headers, stat_result=stat)
+        return Response(body, media_type=self.media_type, headers=headers)
+
+
+class FrontendFiles:
+    """Index of a built SPA. Unknown paths fall back to index.html."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.files: Dict[str, StaticFile] = {}
+        for dirpath, _, filenames in os.walk(self.root):
+            for filename in filenames:
+                if filename.endswith((".gz", ".br")):
+                    continue
+                path = Path(dirpath) / filename
+                rel = path.relative_to(self.root).as_posix()
+                if rel.startswith("assets/"):
+                    cache = IMMUTABLE_CACHE
+                elif rel == "index.html":
+                    cache = REVALIDATE_CACHE
+                else:
+                    cache = SHORT_CACHE
+                self.files[rel] = StaticFile(path, cache)
+        self.index: Optional[StaticFile] = self.files.get("index.html")
+
+    async def serve(self, request: Request) -> Response:
+        path = request.path_params.get("path", "").lstrip("/")
+        static = self.files.get(path)
+        if static is None:
+            if path.startswith("assets/"):
+                return Response("Not Found", status_code=404, media_type="text/plain")
+            static = self.index
+        if static is None:
+            return Response("Not Found", status_code=404, media_type="text/plain")
+        return static.response(request)
+
+
+def _digest(path: Path, body: Optional[bytes]) -> str:
+    if body is not None:
+        return hashlib.sha1(body).hexdigest()[:20]
+    stat = path.stat()
+    return f"{stat.st_size:x}-{int(stat.st_mtime):x}"
+
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    tags = {t.strip().removeprefix("W/") for t in header.split(",")}
+    return "*" in tags or etag in tags
+
+
+def _choose_encoding(accept_encoding: str, variants: Dict[str, object]) -> str:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in ("br", "gzip"):
+        if encoding in variants and accepted.get(encoding, 0) > 0:
+            return encoding
+    return "identity"
@@ -0,0 +1,148 @@
+"""Background suite validation jobs with SSE progress."""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from pipeline.validate import load_suite, validate_suite_streaming
+from .auth import check_admin
+from .routes import SSEResponse
+from .singleflight import SharedRun
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for report retrieval; the oldest are dropped first.
+MAX_JOBS = 100
+
+
+class ValidationJob:
+    def __init__(self, suite_name: str, suite: List[Dict], admin: str):
+        self.job_id = uuid.uuid4().hex[:12]
+        self.suite_name = suite_name
+        self.admin = admin
+        self.total = len(suite)
+        self.done = 0
+        self.status = "running"
+        self.report: Optional[Dict] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.log = SharedRun(self.job_id)
+        self.task = asyncio.create_task(self._run(suite))
+
+    async def _run(self, suite: List[Dict]):
+        events = validate_suite_streaming(suite)
+        try:
+            while True:
+                event = await asyncio.to_thread(next, events, None)
+                if event is None:
+                    break
+                if event["type"] == "test":
+                    self.done = event["done"]
+                elif event["type"] == "report":
+                    self.report = {k: v for k, v in event.items() if k != "type"}
+                    self.status = "done"
+                await self.log.publish({"job_id": self.job_id, **event})
+        except Exception as exc:
+            logger.error(f"Validation job {self.job_id} failed: {exc}")
+            self.status, self.error = "error", str(exc)
+            await self.log.publish({"type": "error", "job_id": self.job_id, "error": str(exc)})
+        finally:
+            self.finished_at = time.time()
+            await self.log.finish()
+
+    def info(self) -> Dict:
+        return {
+            "job_id": self.job_id,
+            "suite": self.suite_name,
+            "started_by": self.admin,
+            "status": self.status,
+            "done": self.done,
+            "total": self.total,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "report": self.report,
+            "error": self.error,
+        }
+
+
+_jobs: "OrderedDict[str, ValidationJob]" = OrderedDict()
+
+
+def _remember(job: ValidationJob):
+    _jobs[job.job_id] = job
+    excess = len(_jobs) - MAX_JOBS
+    if excess > 0:
+        for jid in [jid for jid, j in _jobs.items() if j.status != "running"][:excess]:
+            del _jobs[jid]
+
+
+async def admin_validate_suite(request: Request):
+    admin_name, error = check_admin(request)
+    if error:
+        return error
+    name = request.path_params["name"]
+    try:
+        suite = await asyncio.to_thread(load_suite, name)
+    except FileNotFoundError:
+        return JSONResponse({"error": f"Suite '{name}' not found"}, status_code=404)
+    job = ValidationJob(name, suite, admin_name)
+    _remember(job)
+    logger.info(f"{admin_name} started validation {job.job_id} of '{name}' ({job.total} tests)")
+    return JSONResponse({
+        **job.info(),
+        "events_url": f"/api/admin/validations/{job.job_id}/events",
+        "report_url": f"/api/admin/validations/{job.job_id}",
+    }, status_code=202)
+
+
+def _get_job(request: Request):
+    job = _jobs.get(request.path_params["job_id"])
+    if job is None:
+        return None, JSONResponse({"error": "Validation job not found"}, status_code=404)
+    return job, None
+
+
+async def admin_validation_status(request: Request):
+    admin_name, error = check_admin(request)
+    if error:
+        return error
+    job, error = _get_job(request)
+    if error:
+        return error
+    return JSONResponse(job.info())
+
+
+async def admin_validation_events(request: Request):
+    """Replay the job's events so far, then follow it until the report."""
+    admin_name, error = check_admin(request)
+    if error:
+        return error
+    job, error = _get_job(request)
+    if error:
+        return error
+    return SSEResponse(job.log.follow())
+
+
+async def admin_list_validations(request: Request):
+    admin_name, error = check_admin(request)
+    if error:
+        return error
+    return JSONResponse([
+        {k: v for k, v in job.info().items() if k != "report"} for job in reversed(_jobs.values())
+    ])
+
+
+validation_routes = [
+    Route("/api/admin/suites/{name}/validate", admin_validate_suite, methods=["POST"]),
+    Route("/api/admin/validations", admin_list_validations, methods=["GET"]),
+    Route("/api/admin/validations/{job_id}", admin_validation_status, methods=["GET"]),
+    Route("/api/admin/validations/{job_id}/events", admin_validation_events, methods=["GET"]),
+]
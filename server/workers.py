@@ -0,0 +1,82 @@
+"""Evaluation worker API: registration, job leases and results."""
+
+import asyncio
+import time
+
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from pipeline.coordinator import EvaluationCoordinator
+from .auth import check_admin
+
+coordinator = EvaluationCoordinator()
+
+MAX_LEASE_WAIT = 30.0
+LEASE_POLL_INTERVAL = 0.2
+
+
+async def _worker_body(request: Request):
+    admin_name, error = check_admin(request)
+    if error:
+        return None, error
+    data = await request.json()
+    if not data or not data.get("worker_id"):
+        return None, JSONResponse({"error": "worker_id is required"}, status_code=400)
+    return data, None
+
+
+async def worker_register(request: Request):
+    data, error = await _worker_body(request)
+    if error:
+        return error
+    info = {k: data[k] for k in ("host", "concurrency") if k in data}
+    coordinator.register(data["worker_id"], info)
+    return JSONResponse({"status": "registered", "worker_id": data["worker_id"]})
+
+
+async def worker_heartbeat(request: Request):
+    data, error = await _worker_body(request)
+    if error:
+        return error
+    return JSONResponse({"known": coordinator.heartbeat(data["worker_id"])})
+
+
+async def worker_lease(request: Request):
+    data, error = await _worker_body(request)
+    if error:
+        return error
+    deadline = time.monotonic() + min(float(data.get("wait", 20)), MAX_LEASE_WAIT)
+    while True:
+        jobs = coordinator.lease(data["worker_id"], int(data.get("max_jobs", 1)), wait=0)
+        if jobs is None:
+            return JSONResponse({"jobs": [], "reregister": True})
+        if jobs or time.monotonic() >= deadline:
+            return JSONResponse({"jobs": jobs})
+        await asyncio.sleep(LEASE_POLL_INTERVAL)
+
+
+async def worker_complete(request: Request):
+    data, error = await _worker_body(request)
+    if error:
+        return error
+    accepted = coordinator.complete(
+        data["worker_id"], data.get("job_id", ""), data.get("result"), data.get("error")
+    )
+    return JSONResponse({"accepted": accepted})
+
+
+async def worker_status(request: Request):
+    admin_name, error = check_admin(request)
+    if error:
+        return error
+    return JSONResponse(coordinator.status())
+
+
+worker_routes = [
+    Route("/api/workers", worker_status, methods=["GET"]),
+    Route("/api/workers/register", worker_register, methods=["POST"]),
+    Route("/api/workers/heartbeat", worker_heartbeat, methods=["POST"]),
+    Route("/api/workers/lease", worker_lease, methods=["POST"]),
+    Route("/api/workers/complete", worker_complete, methods=["POST"]),
+]
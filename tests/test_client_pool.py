@@ -0,0 +1,92 @@
+"""Connection reuse of the shared LLM clients against a local OpenRouter stand-in."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("openrouter")
+
+from pipeline import clients
+from pipeline.llm import call_llm
+
+SUITE = [
+    {"id": f"T{i:02d}", "level": 1, "category": "Syntax", "task": "Print a value", "required_elements": ["print"], "points": 10}
+    for i in range(12)
+]
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Answers chat completions (plain or streamed) with the same code for every test."""
+
+    protocol_version = "HTTP/1.1"
+    connections = 0
+
+    def setup(self):
+        super().setup()
+        StandIn.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        ids = list(body["response_format"]["json_schema"]["schema"]["properties"])
+        content = json.dumps({i: "with entry { print(1); }" for i in ids})
+        base = {"id": "x", "created": 1, "model": body["model"]}
+        if body.get("stream"):
+            chunks = [
+                {**base, "object": "chat.completion.chunk",
+                 "choices": [{"index": 0, "delta": {"role": "assistant", "content": content[i:i + 50]}, "finish_reason": None}]}
+                for i in range(0, len(content), 50)
+            ]
+            data = ("".join(f"data: {json.dumps(c)}\n\n" for c in chunks) + "data: [DONE]\n\n").encode()
+            content_type = "text/event-stream"
+        else:
+            data = json.dumps({
+                **base, "object": "chat.completion",
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            }).encode()
+            content_type = "application/json"
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    StandIn.connections = 0
+    pool = clients.ClientPool(f"http://127.0.0.1:{server.server_port}")
+    monkeypatch.setattr(clients, "_pool", pool)
+    yield pool
+    pool.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_runs_reuse_connections(pool):
+    streamed = []
+    for run in range(3):
+        on_response = (lambda test_id, code: streamed.append(test_id)) if run == 1 else None
+        responses = call_llm("key", "model", SUITE, "docs", batch_size=4, on_response=on_response)
+        assert len(responses) == len(SUITE)
+    assert len(streamed) == len(SUITE)
+
+    stats = pool.stats()
+    assert stats["requests"] == 9
+    assert stats["connections_opened"] == StandIn.connections
+    assert stats["connections_opened"] <= 3
+    assert stats["clients"][0]["runs"] == 3
+
+
+def test_clients_are_per_key(pool):
+    call_llm("key-a", "model", SUITE[:4], "docs", batch_size=4)
+    call_llm("key-b", "model", SUITE[:4], "docs", batch_size=4)
+    assert sorted(c["key"] for c in pool.stats()["clients"]) == sorted(
+        [clients.key_id("key-a"), clients.key_id("key-b")]
+    )
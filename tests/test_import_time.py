@@ -0,0 +1,49 @@
+"""Import-time budget of each entry point, measured with ``python -X importtime``.
+
+Each import runs in a fresh interpreter. Besides the time budget, the
+HTTP/LLM stack must not be loaded until first use.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).parent.parent
+
+# Cumulative import time in microseconds; generous against slow CI hosts.
+BUDGETS = {
+    "pipeline.run": 150_000,
+    "pipeline.validate": 100_000,
+    "server.app": 500_000,
+}
+LAZY_MODULES = ("requests", "openrouter", "httpx", "numpy")
+
+
+def import_times(module: str) -> dict:
+    """{module: cumulative microseconds} from a cold ``import module``."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+    times = {}
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line[len("import time:"):].split("|")
+            if cumulative.strip().isdigit():
+                times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.mark.parametrize("module", sorted(BUDGETS))
+def test_import_time_budget(module):
+    if module.startswith("server."):
+        pytest.importorskip("starlette")
+    times = import_times(module)
+    loaded = sorted(m for m in LAZY_MODULES if m in times)
+    assert not loaded, f"importing {module} loads {', '.join(loaded)}"
+    assert times[module] <= BUDGETS[module], (
+        f"importing {module} took {times[module] / 1000:.0f} ms (budget {BUDGETS[module] / 1000:.0f} ms)"
+    )
@@ -72,7 +72,12 @@ export function AdminView() {
   async function handleValidate() {
     if (!editingSuite) return;
     try {
-      setValidationResult(await adminValidateSuite(token, editingSuite));
+      setValidationResult(null);
+      setMessage("validating...");
+      setValidationResult(await adminValidateSuite(token, editingSuite, (done, total) => {
+        setMessage(`validating ${done}/${total}`);
+      }));
+      setMessage("");
     } catch (err) { setError(String(err)); }
   }
 
@@ -7,6 +7,7 @@ interface ProgressState {
   batchesDone: number;
   totalBatches: number;
   totalTests: number;
+  queued?: string;
 }
 
 export function RunView() {
@@ -114,7 +115,13 @@ export function RunView() {
               batchesDone,
               totalBatches: event.total_batches,
               totalTests: prev?.totalTests ?? 0,
+              queued: prev?.queued,
             }));
+          } else if (event.type === "queue" && event.resource === "llm") {
+            const queued = event.position > 0
+              ? `queued behind ${event.position} request(s)${event.eta_seconds != null ? `, ~${Math.ceil(event.eta_seconds)}s` : ""}`
+              : undefined;
+            setProgress((prev) => prev && { ...prev, queued });
           } else if (event.type === "result") {
             setResult(event as BenchmarkResult);
           } else if (event.type === "error") {
@@ -144,9 +151,11 @@ export function RunView() {
   function stageLabel(p: ProgressState): string {
     switch (p.stage) {
       case "connecting": return "connecting...";
+      case "attached": return "joined an identical run in progress...";
       case "validating": return `validating suite (${p.totalTests} tests)`;
       case "fetching_docs": return "fetching documentation...";
-      case "llm_calling": return `api: batch ${p.batchesDone}/${p.totalBatches}`;
+      case "llm_calling":
+        return `api: batch ${p.batchesDone}/${p.totalBatches}` + (p.queued ? ` (${p.queued})` : "");
       case "evaluating": return "evaluating responses...";
       default: return p.stage;
     }
@@ -88,15 +88,45 @@ export async function adminDeleteSuite(
   });
 }
 
+export interface ValidationReport {
+  valid: boolean;
+  issues: string[];
+  warnings: string[];
+}
+
 export async function adminValidateSuite(
   token: string,
-  name: string
-): Promise<{ valid: boolean; issues: string[]; warnings: string[] }> {
-  return request(
+  name: string,
+  onProgress?: (done: number, total: number) => void
+): Promise<ValidationReport> {
+  const job = await request<{ job_id: string; events_url: string }>(
     "/admin/suites/" + encodeURIComponent(name) + "/validate",
     {
       method: "POST",
       headers: adminHeaders(token),
     }
   );
+
+  const response = await fetch(job.events_url, { headers: adminHeaders(token) });
+  if (!response.ok || !response.body) {
+    throw new Error(`Request failed: ${response.status}`);
+  }
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split("\n");
+    buffer = lines.pop() || "";
+    for (const line of lines) {
+      if (!line.startsWith("data: ")) continue;
+      const event = JSON.parse(line.slice(6));
+      if (event.type === "test") onProgress?.(event.done, event.total);
+      else if (event.type === "report") return event as ValidationReport;
+      else if (event.type === "error") throw new Error(event.error);
+    }
+  }
+  throw new Error("validation ended without a report");
 }